@@ -0,0 +1,65 @@
+/**
+ * Baseline Charts JavaScript
+ * Each chart slot in the baseline partials loads its own chart spec through
+ * HTMX (hx-trigger="revealed") once it scrolls into view. This script draws
+ * the loaded specs with Plotly.react.
+ *
+ * The layout, template and config shared by every chart of the tab are
+ * embedded once in the page (#baseline-chart-defaults); each chart spec only
+ * carries its data and the layout keys that differ from them.
+ */
+
+(function () {
+    if (window.BaselineCharts) {
+        // Already loaded by an earlier HTMX swap - just draw the new content.
+        window.BaselineCharts.drawAll(document);
+        return;
+    }
+
+    // Last spec drawn into each plot element, so unchanged charts are not redrawn.
+    const drawnSpecs = new WeakMap();
+
+    const BaselineCharts = {
+        /**
+         * Shared chart defaults embedded in the current baseline tab.
+         */
+        defaults() {
+            const element = document.getElementById('baseline-chart-defaults');
+            return element ? JSON.parse(element.textContent) : { layout: {}, template: {}, config: {} };
+        },
+
+        /**
+         * Draw every loaded chart spec under `root`.
+         */
+        drawAll(root) {
+            const slots = root.matches && root.matches('[data-chart]')
+                ? [root]
+                : root.querySelectorAll('[data-chart]');
+            if (!slots.length) return;
+
+            const defaults = this.defaults();
+            slots.forEach(slot => {
+                const plot = slot.querySelector('.baseline-chart-plot');
+                const spec = slot.querySelector('script[type="application/json"]');
+                if (plot && spec) this.draw(plot, spec.textContent, defaults);
+            });
+        },
+
+        /**
+         * Draw one chart, skipping the redraw when its spec has not changed.
+         */
+        draw(plot, specText, defaults) {
+            if (drawnSpecs.get(plot) === specText) return;
+
+            const chart = JSON.parse(specText);
+            const layout = Object.assign({}, defaults.layout, { template: defaults.template }, chart.layout);
+            Plotly.react(plot, chart.data, layout, Object.assign({ responsive: true }, defaults.config));
+            drawnSpecs.set(plot, specText);
+        }
+    };
+
+    window.BaselineCharts = BaselineCharts;
+
+    document.addEventListener('htmx:afterSettle', event => BaselineCharts.drawAll(event.target));
+    BaselineCharts.drawAll(document);
+})();
@@ -2,8 +2,9 @@ from django.utils.deprecation import MiddlewareMixin
 
 class NoCacheMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
-        # Add headers to prevent caching for authenticated pages
-        if request.user.is_authenticated:
+        # Add headers to prevent caching for authenticated pages, unless the
+        # view set its own caching policy (e.g. the public county boundaries)
+        if request.user.is_authenticated and not response.has_header('Cache-Control'):
             response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
             response['Pragma'] = 'no-cache'
             response['Expires'] = '0'
@@ -101,6 +101,35 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# The baseline data version, the objects and charts published for it and
+# the timeline charts are shared by every worker process and by
+# manage.py refresh_baseline_data, so the cache must live outside the
+# processes: files under CACHE_LOCATION by default, or e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache with
+# CACHE_LOCATION=redis://127.0.0.1:6379.
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+    }
+}
+if CACHE_BACKEND.endswith('FileBasedCache'):
+    # Culling deletes entries at random, so keep it well above what the
+    # chart caches store per data version (BASELINE_CHART_SHARED_MAX_ENTRIES)
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 20000}
+
+
+# Warm the baseline data, county boundaries and charts when a worker process
+# starts. gunicorn does this from its hooks (gunicorn.conf.py); under
+# OpenLiteSpeed set BASELINE_WARM_UP_ON_STARTUP=1 in the app's environment
+# (not the shell's, or every manage.py command would warm up too).
+BASELINE_WARM_UP_ON_STARTUP = config('BASELINE_WARM_UP_ON_STARTUP', default=False, cast=bool)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,25 @@
+# Gunicorn settings for the dashboard (picked up automatically from the
+# working directory).
+
+bind = "0.0.0.0:8000"
+
+# Load Django in the master process so the baseline data below is mapped
+# once and inherited by every forked worker.
+preload_app = True
+
+
+def when_ready(server):
+    """Warms the master before the workers are forked (no threads are left running)."""
+    from research_dashboard.warmup import run_warm_up
+
+    run_warm_up()
+
+
+def post_fork(server, worker):
+    """
+    Each worker finishes its own warm-up in the background; the readiness
+    endpoint (/health/ready/) reports 503 until it is done.
+    """
+    from research_dashboard.warmup import start_warm_up
+
+    start_warm_up()
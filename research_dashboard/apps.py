@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ResearchDashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'research_dashboard'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the timeline cache receivers)
+
+        # Off by default so management commands do not load the baseline
+        # data; gunicorn workers start the warm-up from their post_fork hook.
+        if getattr(settings, 'BASELINE_WARM_UP_ON_STARTUP', False):
+            from .warmup import start_warm_up
+
+            start_warm_up()
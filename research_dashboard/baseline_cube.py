@@ -0,0 +1,168 @@
+import numpy as np
+
+# The facility dimensions every baseline tab can be filtered by.
+DIMENSIONS = ['county', 'level', 'ownership']
+
+# Columns that identify a facility rather than describe it.
+IDENTIFIER_COLUMNS = ['facility_mfl', 'facility_name']
+
+# Text columns whose value counts the tabs chart.
+CATEGORY_COLUMNS = ['patients_hivncd_care', 'his_hiv', 'his_ncd', 'bp_monitor_available', 'glucometers_strips_available']
+CATEGORY_PREFIXES = ('where_procure_med___', 'governce_challenge_integration___')
+
+# Numeric columns the tabs take medians of. Medians cannot be combined from
+# per-cell medians, so the cube keeps these values per facility.
+MEDIAN_COLUMNS = ['total_expenditure_year', 'total_expenditure_hiv', 'total_expenditure_ncd']
+
+
+class BaselineCube:
+    """
+    Pre-aggregated view of the cleaned baseline DataFrame.
+
+    Every statistic is stored per (county, level, ownership) cell: the
+    facility count, the sum and non-null count of each numeric column, and
+    the value counts of each categorical column. A filter selection is
+    answered by adding up the selected cells instead of scanning the raw
+    DataFrame, so the cube only needs to be built once per data load.
+
+    The dimensions are usually categoricals; every group-by uses
+    observed=True so cells without facilities never appear.
+    """
+
+    def __init__(self, df):
+        self.columns = df.columns.tolist()
+
+        grouped = df.groupby(DIMENSIONS, dropna=False, sort=True, observed=True)
+        self.facilities = grouped.size()
+
+        numeric_cols = [
+            col for col in df.select_dtypes(include=np.number).columns
+            if col not in IDENTIFIER_COLUMNS
+        ]
+        self.sums = grouped[numeric_cols].sum()
+        self.counts = grouped[numeric_cols].count()
+
+        # Value counts of every categorical column, one row per
+        # (county, level, ownership, column, value).
+        category_cols = [
+            col for col in df.columns
+            if col in CATEGORY_COLUMNS or col.startswith(CATEGORY_PREFIXES)
+        ]
+        category_long = df[DIMENSIONS + category_cols].melt(
+            id_vars=DIMENSIONS, var_name='column', value_name='value'
+        )
+        self.categories = category_long.groupby(DIMENSIONS + ['column', 'value'], observed=True).size()
+
+        median_cols = [col for col in MEDIAN_COLUMNS if col in df.columns]
+        self.median_values = df[DIMENSIONS + median_cols].reset_index(drop=True)
+
+    def distinct(self, dimension, **filters):
+        """
+        Sorted distinct values of a dimension, optionally restricted to the
+        cells matching `filters` (e.g. county=['Nairobi']).
+        """
+        mask = _index_mask(self.facilities.index, filters)
+        return sorted(self.facilities.index[mask].get_level_values(dimension).unique().tolist())
+
+    def select(self, county, level, ownership):
+        """Returns a CubeSelection covering the cells matching all three filters."""
+        return CubeSelection(self, {'county': county, 'level': level, 'ownership': ownership})
+
+
+class CubeSelection:
+    """
+    The cells of a BaselineCube matching a filter selection.
+
+    Its methods mirror the pandas calls the baseline tabs used to make on the
+    filtered DataFrame and return results shaped the same way.
+    """
+
+    def __init__(self, cube, filters):
+        self.cube = cube
+        self.filters = filters
+        self._cells = _index_mask(cube.facilities.index, filters)
+
+    @property
+    def columns(self):
+        return self.cube.columns
+
+    @property
+    def facility_count(self):
+        return int(self.cube.facilities[self._cells].sum())
+
+    @property
+    def empty(self):
+        return self.facility_count == 0
+
+    def count_by(self, by):
+        """Like filtered_df.groupby(by).size()."""
+        counts = self.cube.facilities[self._cells].groupby(level=by, observed=True).sum()
+        return counts[counts > 0]
+
+    def sum(self, columns):
+        """Like filtered_df[columns].sum()."""
+        return self.cube.sums.loc[self._cells, columns].sum()
+
+    def mean(self, columns):
+        """Like filtered_df[columns].mean()."""
+        return self.sum(columns) / self.cube.counts.loc[self._cells, columns].sum()
+
+    def sum_by(self, by, columns):
+        """Like filtered_df.groupby(by)[columns].sum()."""
+        return self.cube.sums.loc[self._cells, columns].groupby(level=by, observed=True).sum()
+
+    def mean_by(self, by, columns):
+        """Like filtered_df.groupby(by)[columns].mean()."""
+        counts = self.cube.counts.loc[self._cells, columns].groupby(level=by, observed=True).sum()
+        return self.sum_by(by, columns) / counts
+
+    def value_counts(self, column):
+        """Like filtered_df[column].value_counts()."""
+        if column in DIMENSIONS:
+            counts = self.cube.facilities[self._cells].groupby(level=column, observed=True).sum()
+        else:
+            counts = self._category_counts(column).groupby(level='value', observed=True).sum()
+            counts.index.name = column
+        counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        counts.name = 'count'
+        return counts
+
+    def size_by(self, by, column):
+        """Like filtered_df.groupby([by, column]).size()."""
+        counts = self._category_counts(column).groupby(level=[by, 'value'], observed=True).sum()
+        counts = counts[counts > 0]
+        counts.index = counts.index.set_names([by, column])
+        return counts
+
+    def median_by(self, by, columns, ignore_values=()):
+        """
+        Like filtered_df.groupby(by)[columns].median(), with `ignore_values`
+        treated as missing. Medians are taken over the per-facility values
+        of the selected cells.
+        """
+        values = self.cube.median_values
+        values = values[_frame_mask(values, self.filters)]
+        selected = values[columns]
+        if len(ignore_values):
+            selected = selected.replace(list(ignore_values), np.nan)
+        return selected.groupby(values[by], observed=True).median()
+
+    def _category_counts(self, column):
+        counts = self.cube.categories.xs(column, level='column')
+        return counts[_index_mask(counts.index, self.filters)]
+
+
+def _index_mask(index, filters):
+    """Boolean mask of the rows of a MultiIndex whose levels match `filters`."""
+    mask = np.ones(len(index), dtype=bool)
+    for dimension, values in filters.items():
+        mask &= index.get_level_values(dimension).isin(values)
+    return mask
+
+
+def _frame_mask(frame, filters):
+    """Boolean mask of the rows of a DataFrame whose columns match `filters`."""
+    mask = np.ones(len(frame), dtype=bool)
+    for dimension, values in filters.items():
+        mask &= frame[dimension].isin(values).to_numpy()
+    return mask
@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .baseline_cube import BaselineCube
+from .data_utils import create_average_df, get_baseline_csv_path, get_snapshot_dir, load_and_clean_data, map_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuild locks only span the threads of a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Process-local memo of the baseline objects, each tagged with the data
+# version it was built from. A request only reads the small version token
+# from the shared cache; the heavy objects are fetched (or rebuilt) again
+# only after the version changes.
+_baseline_memo = {}
+
+# Fallback rebuild locks, per key, where file locks are unavailable
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+class RebuildLock:
+    """
+    Exclusive lock on rebuilding one baseline object, held by one worker on
+    the host at a time: an flock on a file next to the baseline snapshots.
+    The OS releases it if its holder dies, so it never goes stale. Without
+    fcntl (or a writable snapshot directory) it only spans this process.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._file = None
+        self._thread_lock = None
+
+    def acquire(self, blocking=True):
+        """Takes the lock, waiting for it if `blocking`. Returns whether it was taken."""
+        if fcntl is not None:
+            try:
+                lock_dir = os.path.join(get_snapshot_dir(), 'locks')
+                os.makedirs(lock_dir, exist_ok=True)
+                lock_file = open(os.path.join(lock_dir, f'{self.key}.lock'), 'a')
+            except OSError as e:
+                logger.warning(f"Cannot open the {self.key} rebuild lock file, locking per process: {str(e)}")
+            else:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    lock_file.close()
+                    return False
+                self._file = lock_file
+                return True
+
+        with _thread_locks_lock:
+            thread_lock = _thread_locks.setdefault(self.key, threading.Lock())
+        if not thread_lock.acquire(blocking):
+            return False
+        self._thread_lock = thread_lock
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        elif self._thread_lock is not None:
+            self._thread_lock.release()
+            self._thread_lock = None
+
+def get_baseline_data_version():
+    """
+    Token identifying the currently loaded baseline data. A new token is
+    issued whenever the baseline cache is invalidated, which retires every
+    object and chart fragment built from the previous data.
+    """
+    version = cache.get('baseline_data_version')
+    if version is None:
+        cache.add('baseline_data_version', uuid.uuid4().hex, None)
+        version = cache.get('baseline_data_version')
+    return version
+
+def memoize_baseline(key, build, shared=True, timeout=2592000, stale=True):
+    """
+    Returns the baseline object stored under `key` for the current data version.
+
+    The object is looked up in the process-local memo first, then (if `shared`)
+    in the Django cache under a version-scoped key, and only built when neither
+    holds it for the current version. Shared entries are cached for 30 days
+    (2592000 seconds) by default.
+
+    Rebuilds are single-flight across the host's workers: the one that takes
+    the key's RebuildLock builds the object, while the others keep serving
+    the version they already hold (unless `stale` is False) or wait for the
+    lock and then take the winner's result. The memo entry is swapped in one
+    assignment once the new version is ready.
+    """
+    version = get_baseline_data_version()
+    entry = _baseline_memo.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    versioned_key = f'{key}:{version}'
+    value = cache.get(versioned_key) if shared else None
+    if value is None:
+        lock = RebuildLock(key)
+        if not lock.acquire(blocking=False):
+            if stale and entry is not None:
+                # Another worker is rebuilding this object; serve the previous version.
+                return entry[1]
+            lock.acquire()
+        try:
+            # The previous holder may have just built this version
+            entry = _baseline_memo.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            value = cache.get(versioned_key) if shared else None
+            if value is None:
+                value = build()
+                if shared:
+                    cache.set(versioned_key, value, timeout)
+            _baseline_memo[key] = (version, value)
+        finally:
+            lock.release()
+    else:
+        _baseline_memo[key] = (version, value)
+    return value
+
+def get_served_baseline_version(key='baseline_cube'):
+    """
+    Data version of the `key` object this process is serving. It lags behind
+    get_baseline_data_version() while another worker rebuilds the object.
+    """
+    entry = _baseline_memo.get(key)
+    return entry[0] if entry is not None else None
+
+def get_published_baseline(version=None):
+    """
+    What publish_baseline_version recorded for a data version (the current one
+    by default): {'snapshot', 'source_hash', 'published_at'}, or None.
+    """
+    return cache.get(f'baseline_published:{version or get_baseline_data_version()}')
+
+def load_baseline_data():
+    """
+    Loads the baseline frame, memory-mapped from the snapshot published for the
+    current version. Only when nothing has been published for it (no refresh
+    has run yet) is the CSV loaded, and cleaned if it has no snapshot either.
+    """
+    try:
+        published = get_published_baseline()
+        df = map_snapshot(published['snapshot']) if published and published['snapshot'] else None
+        if df is None:
+            df = load_and_clean_data(get_baseline_csv_path())
+        if df is None:
+            raise ValueError("Failed to load baseline data file")
+    except Exception as e:
+        logger.error(f"Error loading baseline data: {str(e)}")
+        raise
+    return df
+
+def get_baseline_data(stale=True):
+    """
+    Centralized function to load the baseline data.
+
+    The frame is memory-mapped from its on-disk snapshot and shared by every
+    request in the process (and, with gunicorn's preload_app, by every worker),
+    so it is kept out of the Django cache. Objects derived from it pass
+    stale=False so they are never built from the previous version.
+    """
+    return memoize_baseline('baseline_df', load_baseline_data, shared=False, stale=stale)
+
+def get_baseline_data_with_averages():
+    """Get both baseline data and averaged data with consistent caching"""
+    df_with_averages = memoize_baseline(
+        'baseline_df_with_averages', lambda: create_average_df(get_baseline_data(stale=False))
+    )
+    return get_baseline_data(), df_with_averages
+
+def get_baseline_cube():
+    """Get the pre-aggregated filter cube for the baseline data, built once per data load"""
+    return memoize_baseline('baseline_cube', lambda: BaselineCube(get_baseline_data(stale=False)))
+
+# Cache warm-up function
+def warm_up_baseline_cache():
+    """Pre-load baseline data cache to avoid cold-start delays"""
+    try:
+        get_baseline_data_with_averages()
+        get_baseline_cube()
+        return True
+    except Exception as e:
+        logger.error(f"Error warming up baseline cache: {str(e)}")
+        return False
@@ -0,0 +1,1039 @@
+import json
+import logging
+import uuid
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.views import View
+from django.views.decorators.http import require_http_methods
+
+from .baseline_cube import BaselineCube
+from .baseline_data import get_baseline_cube, get_served_baseline_version
+from .chart_cache import canonical_filters, get_chart, set_chart
+from .county_geojson import DEFAULT_DETAIL, DETAIL_LEVELS
+from .data_utils import (
+    create_average_df, file_content_hash, get_baseline_csv_path, load_snapshot, prepare_snapshot,
+    release_baseline_data,
+)
+from .geo_views import get_county_geojson
+from .models import ResearchProject
+
+# Set up a logger for this module
+logger = logging.getLogger(__name__)
+
+
+# Add cache invalidation endpoint
+@require_http_methods(["POST"])
+@login_required
+def invalidate_baseline_cache(request):
+    """Invalidate baseline data cache (admin-only)"""
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    # Rebuild the data and publish it as a new version. The version pointer
+    # only moves once its snapshot, aggregates and charts are cached, so the
+    # workers keep serving the previous version meanwhile and never build
+    # the new one inline.
+    try:
+        version = publish_baseline_version()
+    except Exception:
+        logger.exception("Baseline refresh from the invalidation endpoint failed")
+        return JsonResponse({'error': 'Baseline refresh failed'}, status=500)
+    release_baseline_data()
+    return JsonResponse({'status': 'cache invalidated', 'version': version})
+
+class ProjectBaselineView(LoginRequiredMixin, View):
+    """
+    This single view handles the entire Baseline section and all its tabs.
+    It intelligently returns either a full page or a content partial
+    based on whether the request is a normal navigation or an AJAX call.
+    """
+    full_page_template = 'research_dashboard/project_detail.html'
+    content_partial_template = 'research_dashboard/partials/baseline_content.html'
+    
+    # Define all available tabs and the name used for them in messages
+    TABS = {
+        'facility_profile': 'facility profile',
+        'staff_profile': 'staff profile',
+        'service_integration': 'service integration',
+        'patient_load': 'patient load',
+        'his': 'Health Information Systems',
+        'supply_chain': 'Supply Chain',
+        'governance': 'Governance and Challenges',
+        'system_financing': 'Health Financing',
+        # Add more tabs here as needed
+    }
+
+    # Per-chart handler registry. Every chart slot in the baseline partials
+    # maps to (tab, builder method, builder options), so each chart can be
+    # built on its own when its slot scrolls into view. A tab's charts are
+    # listed in the order the tab lays them out.
+    CHART_HANDLERS = {
+        'chart_county': ('facility_profile', 'build_facility_distribution', {'by': 'county'}),
+        'chart_level': ('facility_profile', 'build_facility_distribution', {'by': 'level'}),
+        'chart_ownership': ('facility_profile', 'build_facility_distribution', {'by': 'ownership'}),
+
+        'chart_total_staff': ('staff_profile', 'build_total_staff', {}),
+        'chart_count_by_county': ('staff_profile', 'build_staff_count_by', {'by': 'county'}),
+        'chart_avg_staff': ('staff_profile', 'build_average_staff', {}),
+        'chart_by_county': ('staff_profile', 'build_staff_average_by', {'by': 'county'}),
+        'chart_by_level': ('staff_profile', 'build_staff_average_by', {'by': 'level'}),
+        'chart_by_ownership': ('staff_profile', 'build_staff_average_by', {'by': 'ownership'}),
+
+        'chart_model_by_county': ('service_integration', 'build_service_model_by', {'by': 'county'}),
+        'chart_model_by_ownership': ('service_integration', 'build_service_model_by', {'by': 'ownership'}),
+        'chart_model_by_level': ('service_integration', 'build_service_model_by', {
+            'by': 'level', 'title': 'Baseline HIV/NCD Service Delivery Models by KEPH levels'}),
+
+        'chart_total_annual_visits': ('patient_load', 'build_total_annual_visits', {}),
+        'chart_avg_visits_by_county': ('patient_load', 'build_average_monthly_visits_by', {'by': 'county'}),
+        'chart_abs_visits_by_county': ('patient_load', 'build_total_annual_visits_by', {'by': 'county'}),
+        'chart_avg_visits_by_level': ('patient_load', 'build_average_monthly_visits_by', {'by': 'level'}),
+        'chart_avg_visits_by_ownership': ('patient_load', 'build_average_monthly_visits_by', {'by': 'ownership'}),
+        'chart_monthly_trend': ('patient_load', 'build_monthly_visits_trend', {}),
+
+        'chart_hiv_overall': ('his', 'build_his_overall', {
+            'column': 'his_hiv', 'service': 'HIV', 'colors': px.colors.sequential.GnBu_r, 'yaxis_title': 'HIS Type'}),
+        'chart_ncd_overall': ('his', 'build_his_overall', {
+            'column': 'his_ncd', 'service': 'NCD', 'colors': px.colors.sequential.OrRd_r, 'yaxis_title': None}),
+        'chart_hiv_by_county': ('his', 'build_his_by', {'column': 'his_hiv', 'service': 'HIV', 'by': 'county'}),
+        'chart_ncd_by_county': ('his', 'build_his_by', {'column': 'his_ncd', 'service': 'NCD', 'by': 'county'}),
+        'chart_hiv_by_level': ('his', 'build_his_by', {'column': 'his_hiv', 'service': 'HIV', 'by': 'level'}),
+        'chart_ncd_by_level': ('his', 'build_his_by', {'column': 'his_ncd', 'service': 'NCD', 'by': 'level'}),
+        'chart_hiv_by_ownership': ('his', 'build_his_by', {'column': 'his_hiv', 'service': 'HIV', 'by': 'ownership'}),
+        'chart_ncd_by_ownership': ('his', 'build_his_by', {'column': 'his_ncd', 'service': 'NCD', 'by': 'ownership'}),
+
+        'chart_procure_overall': ('supply_chain', 'build_procurement_overall', {}),
+        'chart_equip_overall': ('supply_chain', 'build_equipment_overall', {}),
+        'chart_procure_by_county': ('supply_chain', 'build_procurement_by', {'by': 'county'}),
+        'chart_equip_by_county': ('supply_chain', 'build_equipment_by', {'by': 'county'}),
+        'chart_procure_by_level': ('supply_chain', 'build_procurement_by', {'by': 'level'}),
+        'chart_equip_by_level': ('supply_chain', 'build_equipment_by', {'by': 'level'}),
+        'chart_procure_by_ownership': ('supply_chain', 'build_procurement_by', {'by': 'ownership'}),
+        'chart_equip_by_ownership': ('supply_chain', 'build_equipment_by', {'by': 'ownership'}),
+
+        'chart_governance_overall': ('governance', 'build_governance_overall', {}),
+        'chart_governance_by_county': ('governance', 'build_governance_by', {'by': 'county'}),
+        'chart_governance_by_level': ('governance', 'build_governance_by', {'by': 'level'}),
+        'chart_governance_by_ownership': ('governance', 'build_governance_by', {'by': 'ownership'}),
+
+        'chart_financing_by_county': ('system_financing', 'build_median_expenditure_by', {'by': 'county'}),
+        'chart_financing_by_level': ('system_financing', 'build_median_expenditure_by', {'by': 'level'}),
+        'chart_financing_by_ownership': ('system_financing', 'build_median_expenditure_by', {'by': 'ownership'}),
+    }
+
+    # Axis and legend labels of the filter dimensions
+    DIMENSION_LABELS = {
+        'county': 'County',
+        'level': 'KEPH Level',
+        'ownership': 'Ownership',
+    }
+
+    # ===============================================================
+    # Centralized Color Palette Configuration
+    # ===============================================================
+    CATEGORY_COLOR_PALETTES = {
+        'level': px.colors.qualitative.Vivid,
+        'ownership': px.colors.qualitative.G10,
+        'county': px.colors.qualitative.Safe, # Add one for county for consistency
+        # Add other categories here in the future
+    }
+    
+    # Plotly config sent with each tab's chart specs
+    CHART_CONFIGS = {
+        'staff_profile': {'displayModeBar': False},
+    }
+
+    # Default tab if none specified
+    DEFAULT_TAB = 'facility_profile'
+    
+    def get(self, request, *args, **kwargs):
+        project_id = kwargs.get('project_id')
+        project = get_object_or_404(ResearchProject, pk=project_id)
+        
+        # Determine which tab should be active
+        active_tab = request.GET.get('tab', self.DEFAULT_TAB)
+        
+        # Base context for all tabs
+        context = {
+            'project': project,
+            'current_sub_view': active_tab,
+            'current_view': 'baseline',
+        }
+        
+        if active_tab in self.TABS:
+            # The page only carries the filters, the shared chart defaults and
+            # empty chart slots; each slot loads its chart from
+            # ProjectBaselineChartView once it is scrolled into view.
+            try:
+                filter_result = self.get_dependent_filter_options(get_baseline_cube(), request)
+                context.update(filter_result['filter_options'])
+                context['no_data'] = filter_result['selection'].empty
+                context['chart_defaults'] = self.get_chart_defaults(active_tab)
+            except Exception as e:
+                logger.error(f"Error preparing the {active_tab} tab:", exc_info=True)
+                context['error'] = f"An error occurred while generating the {active_tab.replace('_', ' ')} data."
+        else:
+            # Handle invalid tab
+            logger.warning(f"Invalid tab requested: {active_tab}")
+            context['error'] = f"The requested tab '{active_tab}' does not exist."
+        
+        # Determine whether to render full page or partial content
+        if request.headers.get('HX-Request') or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            logger.info("AJAX request detected. Rendering baseline content partial.")
+            return render(request, self.content_partial_template, context)
+        else:
+            logger.info("Full page request detected. Rendering main project detail page.")
+            return render(request, self.full_page_template, context)
+
+    def get_chart_defaults(self, tab):
+        """
+        The layout, template and config shared by every chart of a tab. They
+        are sent to the browser once, and each chart spec only carries what
+        differs from them.
+        """
+        layout = go.Layout(self.get_chart_layout()).to_plotly_json()
+        template = go.Layout(template=layout.pop('template')).template.to_plotly_json()
+        return {
+            'layout': layout,
+            'template': template,
+            'config': self.CHART_CONFIGS.get(tab, {}),
+        }
+
+    def get_chart_cache_version(self):
+        """
+        Data version to cache charts under: that of the cube actually served,
+        which lags the current version while another worker rebuilds it.
+        """
+        try:
+            get_baseline_cube()
+        except Exception:
+            # get_tab_context reports the error; nothing gets cached.
+            return None
+        return get_served_baseline_version()
+
+    def get_chart_spec(self, fig, defaults):
+        """
+        Converts a figure to a compact Plotly spec for Plotly.react: its data
+        plus the layout keys that differ from the shared chart defaults.
+        """
+        spec = fig.to_plotly_json()
+        layout = spec['layout']
+        if layout.get('template') == defaults['template']:
+            del layout['template']
+        return {
+            'data': spec['data'],
+            'layout': {name: value for name, value in layout.items() if defaults['layout'].get(name) != value},
+        }
+
+    def get_dependent_filter_options(self, cube, request):
+        """
+        Handles dependent filtering logic.
+        1. Filters by county.
+        2. Determines available levels and ownerships from the county-filtered cells.
+        3. Applies the final filters.
+
+        Everything is answered from the pre-aggregated BaselineCube, so no
+        rows of the baseline DataFrame are scanned or copied.
+        """
+        # 1. Always get the full list of counties for the first filter.
+        all_distinct_counties = cube.distinct('county')
+        selected_counties = [c for c in request.GET.getlist('county', all_distinct_counties) if c]
+        if not selected_counties:
+            selected_counties = all_distinct_counties
+
+        # 2. Get the distinct levels and owners of the cells in the selected counties.
+        distinct_levels = cube.distinct('level', county=selected_counties)
+        distinct_owners = cube.distinct('ownership', county=selected_counties)
+
+        # 3. Get the selected levels and owners from the request, defaulting to all available.
+        selected_levels = [l for l in request.GET.getlist('level', distinct_levels) if l]
+        if not selected_levels:
+            selected_levels = distinct_levels
+
+        selected_owners = [o for o in request.GET.getlist('ownership', distinct_owners) if o]
+        if not selected_owners:
+            selected_owners = distinct_owners
+
+        # 4. Select the cube cells matching all three selections.
+        selection = cube.select(selected_counties, selected_levels, selected_owners)
+
+        # 5. Return both the selection and the filter options for the context.
+        return {
+            'selection': selection,
+            'filter_options': {
+                'distinct_counties': all_distinct_counties,
+                'distinct_levels': distinct_levels,
+                'distinct_owners': distinct_owners,
+                'selected_counties': selected_counties,
+                'selected_levels': selected_levels,
+                'selected_owners': selected_owners
+            }
+        }
+
+    def _count_facilities_with(self, selection, columns, label_map, label, values, by=None):
+        """
+        Counts the facilities whose `columns` hold one of `values`, labelled with
+        `label_map`. Returns a DataFrame of `label` and 'count' columns (plus `by`
+        when stratified), sorted by count for the overall chart.
+        """
+        parts = []
+        for col in columns:
+            if col not in label_map:
+                continue
+            if by:
+                counts = selection.size_by(by, col).reset_index(name='count')
+            else:
+                counts = selection.value_counts(col).reset_index()
+            counts = counts[counts[col].isin(values)].drop(columns=col)
+            counts[label] = label_map[col]
+            parts.append(counts)
+        if not parts:
+            return pd.DataFrame(columns=([by] if by else []) + [label, 'count'])
+
+        counts = pd.concat(parts, ignore_index=True)
+        if by:
+            return counts.groupby([by, label], observed=True)['count'].sum().reset_index()
+        counts = counts.groupby(label, sort=False)['count'].sum()
+        return counts.sort_values(ascending=False, kind='stable').reset_index()
+
+    def get_chart_layout(self):
+        """
+        Returns a consistent chart layout for all charts
+        """
+        return {
+        'height': 450,
+        'template': 'plotly_white',
+        'plot_bgcolor': '#f8fafc',
+
+        'title': {'x': 0.5, 'xanchor': 'center', 'font': {'size': 16, 'family': 'Arial, sans-serif'}},
+        'legend': {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'xanchor': 'right', 'x': 1},
+        'margin': {'l': 40, 'r': 20, 't': 80, 'b': 20},
+        'xaxis': {'title': None, 'automargin': True },
+        'yaxis': {'title': 'Count','automargin': True},
+        }
+    
+    def get_tab_charts(self, tab):
+        """Returns the chart keys of a tab, in the order the tab lays them out."""
+        return [chart for chart, (chart_tab, _, _) in self.CHART_HANDLERS.items() if chart_tab == tab]
+
+    def get_tab_context(self, tab, request, context, charts=None, cube=None):
+        """
+        Builds the figures of a tab's charts (or only `charts`) for the
+        current filter selection into context['figures'], from `cube` or
+        the currently served one.
+        """
+        logger.info(f"Generating context for the '{tab}' tab.")
+        try:
+            filter_result = self.get_dependent_filter_options(cube or get_baseline_cube(), request)
+            selection = filter_result['selection']
+            context.update(filter_result['filter_options'])
+
+            if selection.empty:
+                context['no_data'] = True
+                return context
+
+            # Get the standard chart layout
+            chart_layout = self.get_chart_layout()
+
+            figures = {}
+            for chart in charts or self.get_tab_charts(tab):
+                _, builder_name, options = self.CHART_HANDLERS[chart]
+                figures[chart] = getattr(self, builder_name)(selection, chart_layout, **options)
+            context['figures'] = figures
+
+        except KeyError as e:
+            logger.error(f"Column not found for {tab} analysis: {e}", exc_info=True)
+            context['error'] = f"The data required for {self.TABS[tab]} analysis is not available."
+        except Exception:
+            logger.error(f"Error generating {tab} context:", exc_info=True)
+            context['error'] = f"An error occurred while generating the {self.TABS[tab]} charts."
+
+        return context
+
+    # ===============================================================
+    # Facility Profile
+    # ===============================================================
+    def build_facility_distribution(self, selection, chart_layout, by):
+        counts = selection.value_counts(by).reset_index()
+        category_orders = {by: counts[by].tolist()} if by != 'county' else None
+        fig = px.bar(counts, x=by, y='count', color=by,
+                     title=f'Distribution by {self.DIMENSION_LABELS[by]}', text_auto=True,
+                     color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by),
+                     category_orders=category_orders)
+        fig.update_layout(chart_layout, showlegend=False)
+        return fig
+
+    # ===============================================================
+    # Staff Profile
+    # ===============================================================
+    KEY_STAFF_COLUMNS = [
+        'employed_nurse', 'employed_co', 'employed_lab_tech', 'employed_doc',
+        'employed_hts_counsellors', 'employed_pharmaceutical', 'employed_nutritionist',
+        'employed_pharmacist'
+    ]
+
+    @staticmethod
+    def _clean_staff_column_name(col_name):
+        return col_name.replace('employed_', '').replace('_', ' ').title()
+
+    def build_total_staff(self, selection, chart_layout):
+        total_staff = selection.sum(self.KEY_STAFF_COLUMNS).astype(float).sort_values(ascending=False).reset_index()
+        total_staff.columns = ['Staff Cadre', 'Total Count']
+        total_staff['Staff Cadre'] = total_staff['Staff Cadre'].apply(self._clean_staff_column_name)
+        fig = px.bar(
+            total_staff,
+            x='Staff Cadre',
+            y='Total Count',
+            text='Total Count',
+            title='Total Staff Count'
+        )
+        fig.update_traces(textposition='outside', texttemplate='%{text:,.0f}')
+        fig.update_layout(chart_layout, showlegend=False, xaxis_title=None, yaxis_title='Total Staff')
+        return fig
+
+    def build_average_staff(self, selection, chart_layout):
+        average_staff = selection.mean(self.KEY_STAFF_COLUMNS).sort_values(ascending=False).reset_index()
+        average_staff.columns = ['Staff Cadre', 'Average Count']
+        average_staff['Staff Cadre'] = average_staff['Staff Cadre'].apply(self._clean_staff_column_name)
+        fig = px.bar(
+            average_staff,
+            x='Staff Cadre',
+            y='Average Count',
+            text='Average Count',
+            title='Average Staff per Facility'
+        )
+        fig.update_traces(textposition='outside', texttemplate='%{text:.2f}')
+        fig.update_layout(chart_layout, showlegend=False, xaxis_title=None, yaxis_title='Average Count')
+        return fig
+
+    def build_staff_count_by(self, selection, chart_layout, by):
+        count_by = pd.melt(selection.sum_by(by, self.KEY_STAFF_COLUMNS).reset_index(), id_vars=by)
+        count_by['variable'] = count_by['variable'].apply(self._clean_staff_column_name)
+        label = self.DIMENSION_LABELS[by]
+        fig = px.bar(
+            count_by,
+            x='variable',
+            y='value',
+            color=by,
+            barmode='group',
+            text='value',
+            title=f'Total Staff Count by {label}',
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by),
+        )
+        fig.update_layout(chart_layout, xaxis_title=None, yaxis_title='Total Staff Count', legend_title_text=label)
+        fig.update_traces(textposition='outside', texttemplate='%{text:,.0f}')
+        return fig
+
+    def build_staff_average_by(self, selection, chart_layout, by):
+        avg_by = pd.melt(selection.mean_by(by, self.KEY_STAFF_COLUMNS).reset_index(), id_vars=by)
+        avg_by['variable'] = avg_by['variable'].apply(self._clean_staff_column_name)
+        label = self.DIMENSION_LABELS[by]
+        fig = px.bar(
+            avg_by,
+            x='variable',
+            y='value',
+            color=by,
+            barmode='group',
+            text_auto='.2f',
+            title=f'Average Staff by {label}',
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by),
+        )
+        fig.update_layout(chart_layout, xaxis_title=None, yaxis_title='Average per Facility', legend_title_text=label)
+        fig.update_traces(textposition='outside')
+        return fig
+
+    # ===============================================================
+    # Service Integration
+    # ===============================================================
+    def build_service_model_by(self, selection, chart_layout, by, title=None):
+        label = self.DIMENSION_LABELS[by]
+        # Group the data by both the dimension and the service model, then get the size of each group.
+        model_by = selection.size_by(by, 'patients_hivncd_care').reset_index(name='count')
+        fig = px.bar(
+            model_by,
+            x='count',                      # Numerical count on the x-axis
+            y='patients_hivncd_care',       # Categorical model on the y-axis
+            color=by,                       # Group bars by the dimension
+            barmode='group',                # Place bars side-by-side
+            title=title or f'Baseline HIV/NCD Service Delivery Models by {label}',
+            text_auto=True,                 # Display the count on each bar
+            orientation='h',
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by),
+        )
+        fig.update_layout(
+            chart_layout,
+            height=500, # Give it a bit more height for readability
+            legend_title_text=label,
+            yaxis_title='Service Delivery Model',
+            xaxis_title='Number of Facilities'
+        ).update_yaxes(categoryorder="total ascending") # Sort models by frequency
+        return fig
+
+    # ===============================================================
+    # Patient Load
+    # ===============================================================
+    @staticmethod
+    def _patient_load_conditions(columns):
+        return {
+            'HIV': [col for col in columns if col.startswith('hiv_') and '_dm' not in col and '_htn' not in col],
+            'DM': [col for col in columns if col.startswith('diabetes_')],
+            'Hypertension': [col for col in columns if col.startswith('htn_') and 'dm_htn' not in col],
+            'DM + HTN': [col for col in columns if 'dm_htn' in col],
+            'HIV + DM': [col for col in columns if 'hiv_dm' in col],
+            'HIV + HTN': [col for col in columns if 'hiv_htn' in col],
+            'HIV + HTN + DM': [col for col in columns if 'hiv_htn_dm' in col]
+        }
+
+    def build_total_annual_visits(self, selection, chart_layout):
+        annual_visits_list = []
+        for condition_name, cols in self._patient_load_conditions(selection.columns).items():
+            if cols:
+                total_visits = selection.sum(cols).sum()
+                annual_visits_list.append({'Condition': condition_name, 'Total Annual Visits (All Facilities)': total_visits})
+
+        annual_visits_df = pd.DataFrame(annual_visits_list).sort_values('Total Annual Visits (All Facilities)', ascending=False)
+        fig = px.bar(
+            annual_visits_df,
+            y='Condition',
+            x='Total Annual Visits (All Facilities)',
+            title='Total Annual Patient Visits by Condition (All Facilities)',
+            text='Total Annual Visits (All Facilities)',
+            orientation='h'
+        )
+        fig.update_traces(texttemplate='%{text:,.0f}')
+        fig.update_layout(
+            chart_layout, height=600,
+            yaxis_title=None,
+            xaxis_title='Total Annual Visits (All Facilities)'
+        ).update_yaxes(categoryorder="total ascending")
+        return fig
+
+    def build_average_monthly_visits_by(self, selection, chart_layout, by):
+        # The mean over facilities of (annual visits / 12) is the summed
+        # annual visits of each group / 12 / the group's facility count.
+        facility_counts = selection.count_by(by)
+        averages = pd.DataFrame({
+            condition_name: selection.sum_by(by, cols).sum(axis=1) / 12 / facility_counts
+            for condition_name, cols in self._patient_load_conditions(selection.columns).items() if cols
+        })
+        averages.index.name = by
+
+        label = self.DIMENSION_LABELS[by]
+        df_melted = pd.melt(averages.reset_index(), id_vars=by, var_name='Condition', value_name='Avg. Monthly Visits')
+        fig = px.bar(
+            df_melted, x='Condition', y='Avg. Monthly Visits', color=by, barmode='group',
+            title=f'Average Monthly Patient Visits per Facility by {label}', text_auto='.1f',
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by),
+        )
+        fig.update_layout(chart_layout, legend_title_text=label)
+        return fig
+
+    def build_total_annual_visits_by(self, selection, chart_layout, by):
+        # Sum each condition's annual visits over the facilities of each group.
+        totals = pd.DataFrame({
+            condition_name: selection.sum_by(by, cols).sum(axis=1)
+            for condition_name, cols in self._patient_load_conditions(selection.columns).items() if cols
+        })
+        totals.index.name = by
+
+        label = self.DIMENSION_LABELS[by]
+        df_melted = pd.melt(totals.reset_index(), id_vars=by, var_name='Condition', value_name='Total Annual Visits')
+        fig = px.bar(
+            df_melted,
+            y='Condition',              # Categorical on Y-axis
+            x='Total Annual Visits',    # Numerical on X-axis
+            color=by,
+            barmode='group',            # Place bars side-by-side
+            title=f'Total Annual Patient Visits by {label}',
+            text='Total Annual Visits',
+            orientation='h',
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by),
+        )
+        fig.update_traces(texttemplate='%{text:,.0f}')
+        fig.update_layout(
+            chart_layout, height=600,
+            yaxis_title=None,
+            xaxis_title='Total Annual Visits',
+            legend_title_text=label
+        ).update_yaxes(categoryorder="total ascending")
+        return fig
+
+    def build_monthly_visits_trend(self, selection, chart_layout):
+        columns = selection.columns
+        conditions = {
+            'HIV Only': [col for col in columns if col.startswith('hiv_') and '_dm' not in col and '_htn' not in col],
+            'DM Only': [col for col in columns if col.startswith('diabetes_')],
+            'Hypertension Only': [col for col in columns if col.startswith('htn_') and 'dm_htn' not in col],
+            'DM+HTN': [col for col in columns if col.startswith('dm_htn')],
+            'HIV+DM': [col for col in columns if col.startswith('hiv_dm')],
+            'HIV+HTN': [col for col in columns if col.startswith('hiv_htn') and '_dm' not in col],
+            'HIV+HTN+DM': [col for col in columns if col.startswith('hiv_htn_dm')]
+        }
+        col_to_condition_map = {col: cond for cond, cols in conditions.items() for col in cols}
+        all_condition_cols = list(col_to_condition_map.keys())
+
+        # Monthly totals of every condition column over the selected facilities
+        df_long = selection.sum(all_condition_cols).rename_axis('condition_month').reset_index(name='visits')
+        df_long['Condition'] = df_long['condition_month'].map(col_to_condition_map)
+        df_long['month'] = df_long['condition_month'].apply(lambda x: x.split('_')[-1])
+        month_order = ['jan', 'feb', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october', 'november', 'december']
+        df_long['month'] = pd.Categorical(df_long['month'], categories=month_order, ordered=True)
+        monthly_trends = df_long.groupby(['month', 'Condition'], observed=True)['visits'].sum().reset_index()
+
+        conditions_to_plot = ['HIV Only', 'Diabetes Only', 'Hypertension Only', 'HIV+HTN', 'HIV+DM', 'HIV+HTN+DM']
+        trend_data_subset = monthly_trends[monthly_trends['Condition'].isin(conditions_to_plot)].copy()
+
+        # Add a formatted text column for clean labels on the chart
+        trend_data_subset['visits_text'] = trend_data_subset['visits'].apply(lambda x: f'{x:,.0f}')
+
+        fig = px.line(
+            trend_data_subset,
+            x='month',
+            y='visits',
+            color='Condition',      # Replaces 'hue'
+            line_dash='Condition',  # Replaces 'style' for different line types
+            markers=True,
+            text='visits_text',     # Specify the column for text labels
+            title='Total Monthly Patient Visits Trend'
+        )
+
+        # Style the text labels to appear above the markers
+        fig.update_traces(textposition="top center")
+
+        # Apply the shared layout and customize further
+        y_max = trend_data_subset['visits'].max()
+        fig.update_layout(
+            chart_layout,
+            height=600,
+            xaxis_title='Month',
+            yaxis_title='Total Number of Monthly Visits',
+            legend_title_text='Condition'
+        ).update_yaxes(
+            range=[0, y_max * 1.15 if y_max > 0 else 10] # Set y-axis range
+        )
+        return fig
+
+    # ===============================================================
+    # Health Information Systems
+    # ===============================================================
+    def build_his_overall(self, selection, chart_layout, column, service, colors, yaxis_title):
+        counts = selection.value_counts(column).reset_index()
+        fig = px.bar(
+            counts,
+            x='count',
+            y=column,
+            title=f'Health Information Systems (HIS) Used for {service} Services',
+            text_auto=True,
+            orientation='h',
+            color_discrete_sequence=colors
+        )
+        fig.update_layout(
+            chart_layout,
+            xaxis_title='Number of Facilities',
+            yaxis_title=yaxis_title
+        ).update_yaxes(categoryorder="total ascending")
+        return fig
+
+    def build_his_by(self, selection, chart_layout, column, service, by):
+        label = self.DIMENSION_LABELS[by]
+        counts = selection.size_by(by, column).reset_index(name='count')
+        fig = px.bar(
+            counts, y=column, x='count', color=by, barmode='group',
+            title=f'HIS for {service} Services by {label}', text_auto=True, orientation='h',
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by)
+        )
+        fig.update_layout(
+            chart_layout, height=600, legend_title_text=label,
+            xaxis_title='Number of Facilities', yaxis_title='HIS Type'
+        ).update_yaxes(categoryorder="total ascending")
+        return fig
+
+    # ===============================================================
+    # Supply Chain & Products
+    # ===============================================================
+    PROCUREMENT_SOURCES = {
+        'where_procure_med___1': 'KEMSA', 'where_procure_med___2': 'Private Suppliers',
+        'where_procure_med___3': 'Faith-Based', 'where_procure_med___4': 'Partners/Donors',
+        'where_procure_med___5': 'Other'
+    }
+    EQUIPMENT_NAMES = {
+        'bp_monitor_available': 'BP Monitors',
+        'glucometers_strips_available': 'Glucometers & Strips'
+    }
+    AVAILABLE_EQUIPMENT_STATUSES = ['available in use', 'available not in use']
+
+    def _procure_columns(self, selection):
+        return [col for col in selection.columns if 'where_procure_med___' in col]
+
+    def build_procurement_overall(self, selection, chart_layout):
+        procure_counts = self._count_facilities_with(
+            selection, self._procure_columns(selection), self.PROCUREMENT_SOURCES, 'Procurement Source', ['Checked']
+        )
+        fig = px.bar(procure_counts, x='count', y='Procurement Source', title='Sources of Medication Procurement', text_auto=True, orientation='h')
+        fig.update_layout(chart_layout, xaxis_title='Number of Facilities', yaxis_title='Source').update_yaxes(categoryorder="total ascending")
+        return fig
+
+    def build_equipment_overall(self, selection, chart_layout):
+        equip_counts = pd.concat([
+            selection.value_counts(col).rename_axis('Status').reset_index().assign(**{'Equipment Label': label})
+            for col, label in self.EQUIPMENT_NAMES.items()
+        ]).groupby(['Equipment Label', 'Status'], observed=True)['count'].sum().reset_index()
+        status_color_map = {'available in use': 'green', 'available not in use': 'blue', 'not available': 'red'}
+        fig = px.bar(equip_counts, x='Equipment Label', y='count', color='Status', barmode='stack',
+                     title='Availability of Basic Diagnostic Equipment', text_auto=True,
+                     color_discrete_map=status_color_map)
+        fig.update_layout(chart_layout, xaxis_title=None, yaxis_title='Number of Facilities').update_traces(textfont_color='white')
+        return fig
+
+    def build_procurement_by(self, selection, chart_layout, by):
+        label = self.DIMENSION_LABELS[by]
+        procure_by = self._count_facilities_with(
+            selection, self._procure_columns(selection), self.PROCUREMENT_SOURCES, 'Procurement Source', ['Checked'], by=by
+        )
+        fig = px.bar(procure_by, y='Procurement Source', x='count', color=by, barmode='group',
+                     title=f'Procurement Sources by {label}', text_auto=True, orientation='h',
+                     color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by))
+        fig.update_layout(chart_layout, legend_title_text=label).update_yaxes(categoryorder="total ascending")
+        return fig
+
+    def build_equipment_by(self, selection, chart_layout, by):
+        label = self.DIMENSION_LABELS[by]
+        equip_by = self._count_facilities_with(
+            selection, list(self.EQUIPMENT_NAMES), self.EQUIPMENT_NAMES, 'Equipment Label',
+            self.AVAILABLE_EQUIPMENT_STATUSES, by=by
+        )
+        fig = px.bar(equip_by, x='Equipment Label', y='count', color=by, barmode='group',
+                     title=f'Available Equipment by {label}', text_auto=True,
+                     color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by))
+        fig.update_layout(chart_layout, yaxis_title='Number of Facilities',
+                          legend_title_text=label).update_traces(textposition='outside')
+        return fig
+
+    # ===============================================================
+    # Governance & Challenges
+    # ===============================================================
+    GOVERNANCE_CHALLENGES = {
+        'governce_challenge_integration___1': 'Lack of integrated guidelines/SOPs',
+        'governce_challenge_integration___2': 'Separate M&E frameworks',
+        'governce_challenge_integration___3': 'Inadequate leadership/governance',
+        'governce_challenge_integration___4': 'Inadequate/separate funding',
+        'governce_challenge_integration___6': 'Poor referral coordination',
+        'governce_challenge_integration___7': 'Inadequate HR capacity/training',
+        'governce_challenge_integration___8': 'High workload for providers',
+        'governce_challenge_integration___5': 'Other'
+    }
+
+    def _challenge_columns(self, selection):
+        return [col for col in selection.columns if 'governce_challenge_integration___' in col]
+
+    def build_governance_overall(self, selection, chart_layout):
+        challenge_counts = self._count_facilities_with(
+            selection, self._challenge_columns(selection), self.GOVERNANCE_CHALLENGES, 'Challenge', ['Checked']
+        )
+        fig = px.bar(
+            challenge_counts, y='Challenge', x='count', color="count",
+            title='Top Self-Reported Challenges to HIV/NCD Integration',
+            text_auto=True, orientation='h',
+        )
+        fig.update_layout(chart_layout, height=600,
+                          xaxis_title='Number of Facilities Citing Challenge',
+                          yaxis_title='').update_yaxes(categoryorder="total ascending")
+        return fig
+
+    def build_governance_by(self, selection, chart_layout, by):
+        label = self.DIMENSION_LABELS[by]
+        challenges_by = self._count_facilities_with(
+            selection, self._challenge_columns(selection), self.GOVERNANCE_CHALLENGES, 'Challenge', ['Checked'], by=by
+        )
+        fig = px.bar(
+            challenges_by, y='Challenge', x='count', color=by, barmode='group',
+            title=f'Integration Challenges by {label}', text_auto=True, orientation='h',
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by)
+        )
+        fig.update_layout(chart_layout, height=600,
+                          legend_title_text=label,
+                          yaxis_title='').update_yaxes(categoryorder="total ascending")
+        return fig
+
+    # ===============================================================
+    # System Financing
+    # ===============================================================
+    EXPENDITURE_COLUMNS = {
+        'Total Expenditure': 'total_expenditure_year',
+        'HIV Expenditure': 'total_expenditure_hiv',
+        'NCD Expenditure': 'total_expenditure_ncd'
+    }
+
+    def build_median_expenditure_by(self, selection, chart_layout, by):
+        label = self.DIMENSION_LABELS[by]
+        # 9999 is a placeholder for a missing value, not an expenditure
+        median_exp = selection.median_by(by, list(self.EXPENDITURE_COLUMNS.values()), ignore_values=[9999]).reset_index()
+        df_melted = pd.melt(median_exp, id_vars=by, var_name='Expenditure Type', value_name='Median Annual Expenditure (KES)')
+        df_melted['Expenditure Type'] = df_melted['Expenditure Type'].map({v: k for k, v in self.EXPENDITURE_COLUMNS.items()})
+
+        fig = px.bar(
+            df_melted, x=by, y='Median Annual Expenditure (KES)', color='Expenditure Type',
+            barmode='group', title=f'Median Annual Expenditure by {label}', text_auto=True,
+            category_orders={'level': ['Level 2', 'Level 3', 'Level 4']} if by == 'level' else None,
+            color_discrete_sequence=self.CATEGORY_COLOR_PALETTES.get(by)
+        )
+        fig.update_layout(chart_layout, legend_title_text='Expenditure').update_traces(texttemplate='%{y:,.0f}')
+        return fig
+
+
+class ProjectBaselineChartsView(ProjectBaselineView):
+    """
+    JSON chart specs for every chart of one baseline tab, for clients that
+    render a whole tab at once with Plotly.react. Responses are cached per
+    (data version, tab, filters).
+    """
+
+    def get(self, request, *args, **kwargs):
+        get_object_or_404(ResearchProject, pk=kwargs.get('project_id'))
+        tab = kwargs.get('tab')
+
+        if tab not in self.TABS:
+            return JsonResponse({'error': f"The requested tab '{tab}' does not exist."}, status=404)
+
+        cache_key = (self.get_chart_cache_version(), tab, canonical_filters(request))
+        payload = get_chart(cache_key)
+        if payload is None:
+            payload, error = self.render_tab(tab, request)
+            if error is not None:
+                return JsonResponse({'error': error}, status=500)
+            set_chart(cache_key, payload)
+
+        return HttpResponse(payload, content_type='application/json')
+
+    def render_tab(self, tab, request, cube=None):
+        """
+        Serializes the specs of every chart of a tab.
+
+        Returns:
+            tuple: (JSON payload, None) or (None, error message).
+        """
+        context = self.get_tab_context(tab, request, {}, cube=cube)
+        if 'error' in context:
+            return None, context['error']
+
+        specs = self.get_chart_defaults(tab)
+        specs['no_data'] = context.get('no_data', False)
+        specs['charts'] = {
+            chart: self.get_chart_spec(fig, specs)
+            for chart, fig in context.get('figures', {}).items()
+        }
+        return to_json_plotly(specs), None
+
+
+class ProjectBaselineChartView(ProjectBaselineView):
+    """
+    A single baseline chart, requested by its slot in the baseline partials
+    with hx-trigger="revealed". Returns an HTML fragment holding the chart's
+    spec, which baseline_charts.js draws with Plotly.react. Fragments are
+    cached per (data version, chart, filters).
+    """
+    chart_template = 'research_dashboard/partials/_baseline_chart_spec.html'
+
+    def get(self, request, *args, **kwargs):
+        get_object_or_404(ResearchProject, pk=kwargs.get('project_id'))
+        chart = kwargs.get('chart')
+
+        if chart not in self.CHART_HANDLERS:
+            return HttpResponse(status=404)
+
+        cache_key = (self.get_chart_cache_version(), 'chart', chart, canonical_filters(request))
+        fragment = get_chart(cache_key)
+        if fragment is None:
+            fragment, cacheable = self.render_chart(chart, request)
+            if cacheable:
+                set_chart(cache_key, fragment)
+
+        return HttpResponse(fragment)
+
+    def render_chart(self, chart, request, cube=None):
+        """
+        Renders the fragment of one chart.
+
+        Returns:
+            tuple: (HTML fragment, whether it may be cached). Error fragments
+            are not cached.
+        """
+        tab = self.CHART_HANDLERS[chart][0]
+        context = self.get_tab_context(tab, request, {}, charts=[chart], cube=cube)
+        if 'figures' in context:
+            spec = self.get_chart_spec(context['figures'][chart], self.get_chart_defaults(tab))
+            # Round-trip through plotly's encoder so numpy arrays become typed-array JSON
+            context['spec'] = json.loads(to_json_plotly(spec))
+        fragment = render_to_string(self.chart_template, context, request)
+        return fragment, 'error' not in context
+
+class ProjectBaselineChoroplethView(ProjectBaselineView):
+    """
+    County boundaries (GeoJSON) with one baseline metric per county joined
+    onto each feature's properties as 'value', for choropleth maps. The
+    facility filters apply as on the baseline tabs; counties outside the
+    selection get a null value. Responses are cached per (data version,
+    metric, detail, filters).
+    """
+
+    # Metric -> (per-county builder method, builder options, label)
+    CHOROPLETH_METRICS = {
+        'facility_count': ('county_facility_count', {}, 'Number of Facilities'),
+        'staff_total': ('county_staff_total', {}, 'Total Staff'),
+        'annual_visits_hiv': ('county_annual_visits', {'condition': 'HIV'}, 'Total Annual HIV Visits'),
+        'annual_visits_dm': ('county_annual_visits', {'condition': 'DM'}, 'Total Annual DM Visits'),
+        'annual_visits_htn': ('county_annual_visits', {'condition': 'Hypertension'}, 'Total Annual Hypertension Visits'),
+        'annual_visits_dm_htn': ('county_annual_visits', {'condition': 'DM + HTN'}, 'Total Annual DM + HTN Visits'),
+        'annual_visits_hiv_dm': ('county_annual_visits', {'condition': 'HIV + DM'}, 'Total Annual HIV + DM Visits'),
+        'annual_visits_hiv_htn': ('county_annual_visits', {'condition': 'HIV + HTN'}, 'Total Annual HIV + HTN Visits'),
+        'annual_visits_hiv_htn_dm': ('county_annual_visits', {'condition': 'HIV + HTN + DM'}, 'Total Annual HIV + HTN + DM Visits'),
+        'emr_adoption_hiv': ('county_emr_adoption', {'column': 'his_hiv'}, 'Facilities Using an EMR for HIV (%)'),
+        'emr_adoption_ncd': ('county_emr_adoption', {'column': 'his_ncd'}, 'Facilities Using an EMR for NCD (%)'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        get_object_or_404(ResearchProject, pk=kwargs.get('project_id'))
+        metric = kwargs.get('metric')
+
+        if metric not in self.CHOROPLETH_METRICS:
+            return JsonResponse({'error': f"Unknown metric '{metric}'"}, status=404)
+        detail = request.GET.get('detail', DEFAULT_DETAIL)
+        if detail not in DETAIL_LEVELS:
+            return JsonResponse({'error': f"Unknown detail level '{detail}'"}, status=400)
+
+        cache_key = (self.get_chart_cache_version(), 'choropleth', metric, detail, canonical_filters(request))
+        payload = get_chart(cache_key)
+        if payload is None:
+            payload, error = self.render_choropleth(metric, detail, request)
+            if error is not None:
+                return JsonResponse({'error': error}, status=500)
+            set_chart(cache_key, payload)
+
+        return HttpResponse(payload, content_type='application/geo+json')
+
+    def render_choropleth(self, metric, detail, request, cube=None):
+        """
+        Joins the per-county values of `metric` onto the study county boundaries.
+
+        Returns:
+            tuple: (GeoJSON payload, None) or (None, error message).
+        """
+        artifact = get_county_geojson(detail)
+        if artifact is None:
+            return None, "County boundary data could not be loaded"
+
+        builder_name, options, label = self.CHOROPLETH_METRICS[metric]
+        try:
+            selection = self.get_dependent_filter_options(cube or get_baseline_cube(), request)['selection']
+            values = getattr(self, builder_name)(selection, **options) if not selection.empty else pd.Series(dtype=float)
+        except Exception:
+            logger.error(f"Error aggregating the {metric} choropleth:", exc_info=True)
+            return None, f"An error occurred while aggregating {label.lower()}."
+
+        values = {str(county).casefold(): value for county, value in values.dropna().items()}
+        geojson = json.loads(artifact['identity'])
+        for feature in geojson['features']:
+            value = values.get(feature['properties']['name'].casefold())
+            feature['properties']['value'] = None if value is None else round(float(value), 2)
+
+        present = list(values.values())
+        geojson['metric'] = {
+            'name': metric,
+            'label': label,
+            'min': round(float(min(present)), 2) if present else None,
+            'max': round(float(max(present)), 2) if present else None,
+        }
+        return json.dumps(geojson, separators=(',', ':')), None
+
+    def county_facility_count(self, selection):
+        return selection.count_by('county')
+
+    def county_staff_total(self, selection):
+        return selection.sum_by('county', self.KEY_STAFF_COLUMNS).sum(axis=1)
+
+    def county_annual_visits(self, selection, condition):
+        columns = self._patient_load_conditions(selection.columns)[condition]
+        return selection.sum_by('county', columns).sum(axis=1)
+
+    def county_emr_adoption(self, selection, column):
+        # Share of the facilities that reported their HIS, not of all facilities
+        counts = selection.size_by('county', column).unstack(fill_value=0)
+        emr = counts['EMR Based'] if 'EMR Based' in counts else 0
+        return emr / counts.sum(axis=1) * 100
+
+
+def publish_baseline_version(csv_path=None, warm_charts=True):
+    """
+    Rebuilds the baseline data off the request path and publishes it under a
+    new data version: the cleaned snapshot, the averages frame, the filter
+    cube and (if `warm_charts`) the unfiltered chart fragments and tab
+    payloads. The version pointer is flipped only once everything is in the
+    cache, so requests move from the old version to a fully built new one.
+
+    Needs a cache backend shared with the web workers to reach them; the
+    snapshot on disk is shared regardless.
+
+    Returns:
+        str: The new data version.
+    """
+    csv_path = csv_path or get_baseline_csv_path()
+    version = uuid.uuid4().hex
+    source_hash = file_content_hash(csv_path)
+
+    snapshot_path, df = prepare_snapshot(csv_path, source_hash)
+    if df is None:
+        df = load_snapshot(snapshot_path)
+    else:
+        # The snapshot could not be written, workers will load the CSV themselves.
+        snapshot_path = None
+    if df is None:
+        raise ValueError("Failed to load baseline data file")
+
+    cube = BaselineCube(df)
+    cache.set(f'baseline_df_with_averages:{version}', create_average_df(df), 2592000)
+    cache.set(f'baseline_cube:{version}', cube, 2592000)
+    cache.set(f'baseline_published:{version}', {
+        'snapshot': snapshot_path,
+        'source_hash': source_hash,
+        'published_at': timezone.now().isoformat(),
+    }, 2592000)
+    if warm_charts:
+        warm_baseline_charts(version, cube)
+
+    cache.set('baseline_data_version', version, None)
+    logger.info(f"Published baseline data version {version}")
+    return version
+
+def warm_baseline_charts(version, cube):
+    """
+    Fills the chart caches with the unfiltered baseline charts, tabs and
+    county choropleths of `cube`. Charts already in the shared cache are only
+    copied into this process's cache; the rest are rendered.
+    """
+    request = HttpRequest()
+    filters = canonical_filters(request)
+    for tab in ProjectBaselineView.TABS:
+        if get_chart((version, tab, filters)) is None:
+            payload, error = ProjectBaselineChartsView().render_tab(tab, request, cube)
+            if error is None:
+                set_chart((version, tab, filters), payload)
+    for chart in ProjectBaselineView.CHART_HANDLERS:
+        if get_chart((version, 'chart', chart, filters)) is None:
+            fragment, cacheable = ProjectBaselineChartView().render_chart(chart, request, cube)
+            if cacheable:
+                set_chart((version, 'chart', chart, filters), fragment)
+    for metric in ProjectBaselineChoroplethView.CHOROPLETH_METRICS:
+        if get_chart((version, 'choropleth', metric, DEFAULT_DETAIL, filters)) is None:
+            payload, error = ProjectBaselineChoroplethView().render_choropleth(metric, DEFAULT_DETAIL, request, cube)
+            if error is None:
+                set_chart((version, 'choropleth', metric, DEFAULT_DETAIL, filters), payload)
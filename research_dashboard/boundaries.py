@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from django.conf import settings
+
+from .baseline_data import get_baseline_data, memoize_baseline
+from .county_geojson import DETAIL_LEVELS
+
+logger = logging.getLogger(__name__)
+
+# IEBC administrative boundary polygons shipped in research_dashboard/data,
+# by admin level (0 = country, 1 = county, 2 = sub-county)
+ADMIN_LAYERS = {
+    0: 'ken_admbnda_adm0_iebc_20191031.shp',
+    1: 'ken_admbnda_adm1_iebc_20191031.shp',
+    2: 'ken_admbnda_adm2_iebc_20191031.shp',
+}
+
+# Used when the study counties can be read neither from settings.STUDY_COUNTIES
+# nor from the baseline data
+DEFAULT_STUDY_COUNTIES = ["Nairobi", "Kiambu", "Kitui"]
+
+# Coordinates are snapped to this grid (~1 m) when simplifying, which trims
+# the GeoJSON considerably compared with full float precision.
+COORDINATE_GRID_SIZE = 1e-5
+
+_boundary_index = None
+_boundary_index_lock = threading.Lock()
+
+
+def get_study_counties():
+    """
+    The counties the map exposes: settings.STUDY_COUNTIES if set, otherwise
+    the distinct counties of the baseline facilities (per data version).
+    Never the previous version's: workers disagreeing on the counties would
+    keep rebuilding the shared county GeoJSON over each other.
+    """
+    configured = getattr(settings, 'STUDY_COUNTIES', None)
+    if configured:
+        return sorted(configured)
+    try:
+        return memoize_baseline('study_counties', lambda: sorted(
+            get_baseline_data(stale=False)['county'].dropna().astype(str).unique().tolist()
+        ), stale=False)
+    except Exception as e:
+        logger.error(f"Error reading study counties from baseline data: {str(e)}")
+        return DEFAULT_STUDY_COUNTIES
+
+
+def simplify_boundaries(geometry, tolerance):
+    """
+    Simplifies a level's polygons without opening gaps or overlaps between
+    neighbours, then snaps them to COORDINATE_GRID_SIZE.
+
+    Coverage simplification needs shapely 2.1+ with GEOS 3.12 and a valid
+    coverage; otherwise each polygon is simplified on its own, preserving
+    its topology.
+    """
+    if tolerance:
+        try:
+            geometry = geometry.simplify_coverage(tolerance)
+        except (AttributeError, NotImplementedError, ValueError, shapely.errors.ShapelyError):
+            geometry = geometry.simplify(tolerance, preserve_topology=True)
+    return geometry.set_precision(COORDINATE_GRID_SIZE)
+
+
+class AdminBoundaryIndex:
+    """
+    Every admin level's boundaries in EPSG:4326, loaded once, with an STRtree
+    per level for bounding-box queries. Each level is a GeoDataFrame with
+    'name', 'pcode', 'county' (the level 1 name a feature lies in; empty for
+    the country) and 'geometry'.
+    """
+
+    def __init__(self, data_dir=None):
+        data_dir = data_dir or os.path.join(settings.BASE_DIR, 'research_dashboard', 'data')
+        self.levels = {}
+        self.trees = {}
+        for level, filename in ADMIN_LAYERS.items():
+            gdf = gpd.read_file(os.path.join(data_dir, filename))
+            gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+            if gdf.crs.to_epsg() != 4326:
+                gdf = gdf.to_crs(epsg=4326)
+            frame = gpd.GeoDataFrame({
+                'name': gdf[f'ADM{level}_EN'].values,
+                'pcode': gdf[f'ADM{level}_PCODE'].values,
+                'county': gdf['ADM1_EN'].values if level >= 1 else None,
+            }, geometry=gdf.geometry.values, crs='EPSG:4326')
+            self.levels[level] = frame
+            self.trees[level] = shapely.STRtree(frame.geometry.values)
+        # Simplified geometry of each (level, detail), built on first use
+        self._simplified = {}
+        self._lock = threading.Lock()
+
+    def get_geometry(self, level, detail):
+        """A level's geometry simplified to `detail`, as a GeoSeries aligned with the level."""
+        key = (level, detail)
+        with self._lock:
+            if key not in self._simplified:
+                self._simplified[key] = simplify_boundaries(self.levels[level].geometry, DETAIL_LEVELS[detail])
+            return self._simplified[key]
+
+    def query(self, level=1, counties=None, names=None, bbox=None, detail='full'):
+        """
+        Boundaries of one admin level.
+
+        Args:
+            counties (list, optional): Keep only features within these counties
+                (ignored for the country level).
+            names (list, optional): Keep only features with these names.
+            bbox (tuple, optional): (min lon, min lat, max lon, max lat); keep
+                only features intersecting it.
+            detail (str): Simplification level (see DETAIL_LEVELS).
+
+        Name matching ignores case.
+        """
+        frame = self.levels[level]
+        mask = np.ones(len(frame), dtype=bool)
+        if counties is not None and level >= 1:
+            mask &= frame['county'].str.casefold().isin({c.casefold() for c in counties}).values
+        if names:
+            mask &= frame['name'].str.casefold().isin({n.casefold() for n in names}).values
+        if bbox is not None:
+            in_bbox = np.zeros(len(frame), dtype=bool)
+            in_bbox[self.trees[level].query(shapely.box(*bbox), predicate='intersects')] = True
+            mask &= in_bbox
+
+        columns = ['name', 'pcode'] + (['county'] if level >= 2 else [])
+        return gpd.GeoDataFrame(
+            frame.loc[mask, columns], geometry=self.get_geometry(level, detail)[mask], crs='EPSG:4326'
+        )
+
+
+def get_boundary_index():
+    """The process-wide AdminBoundaryIndex, loaded on first use."""
+    global _boundary_index
+    if _boundary_index is None:
+        with _boundary_index_lock:
+            if _boundary_index is None:
+                _boundary_index = AdminBoundaryIndex()
+    return _boundary_index
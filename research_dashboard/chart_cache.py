@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Default upper bound on the rendered chart HTML kept per worker process.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# How long rendered charts are kept in the shared Django cache (1 day), and
+# how many are stored there per data version; charts past that bound stay in
+# the workers' local caches only. Keys include the data version, so stale
+# entries are never read and expire on their own.
+SHARED_TIMEOUT = 86400
+DEFAULT_SHARED_MAX_ENTRIES = 2000
+
+# The request parameters that select which facilities a baseline tab charts.
+FILTER_PARAMS = ('county', 'level', 'ownership')
+
+
+def canonical_filters(request):
+    """
+    Returns the baseline filter selection of a request as a hashable key.
+
+    Values are de-duplicated and sorted so that the same selection in a
+    different order (or with repeated values) maps to the same key. Missing
+    and blank parameters both mean "all" and canonicalize to ().
+    """
+    return tuple(
+        (param, tuple(sorted({value for value in request.GET.getlist(param) if value})))
+        for param in FILTER_PARAMS
+    )
+
+
+class ChartCache:
+    """
+    Process-local LRU cache of rendered baseline charts.
+
+    Entries are serialized chart payloads (JSON strings) and are evicted
+    least-recently-used first once their combined size exceeds `max_bytes`.
+    Keys include the baseline data version, so charts of older data are
+    never served and simply age out.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or getattr(settings, 'BASELINE_CHART_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, payload):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (payload, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+chart_cache = ChartCache()
+
+
+def shared_chart_key(key):
+    """Django cache key for a chart cache key, hashed to stay backend-safe."""
+    return 'baseline_chart:' + hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def is_cache_shared():
+    """
+    Whether the default Django cache is shared between processes. LocMemCache
+    (Django's default) lives inside each process and DummyCache stores nothing.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get_chart(key):
+    """
+    Returns a rendered chart from this process's cache or, failing that, from
+    the shared Django cache, where other workers and the refresh job put theirs.
+    """
+    payload = chart_cache.get(key)
+    if payload is None:
+        payload = cache.get(shared_chart_key(key))
+        if payload is not None:
+            chart_cache.set(key, payload)
+    return payload
+
+
+def set_chart(key, payload):
+    """
+    Stores a rendered chart in this process's cache and, while the data
+    version (key[0]) has fewer than BASELINE_CHART_SHARED_MAX_ENTRIES charts
+    there, in the shared one. Nothing is copied to a cache that is not shared,
+    which would only hold a second, unbounded copy in the same process.
+    """
+    chart_cache.set(key, payload)
+    if not is_cache_shared():
+        return
+
+    count_key = f'baseline_chart_count:{key[0]}'
+    cache.add(count_key, 0, SHARED_TIMEOUT)
+    try:
+        stored = cache.incr(count_key)
+    except ValueError:
+        # The counter expired in between; skip rather than store unbounded.
+        return
+    if stored <= getattr(settings, 'BASELINE_CHART_SHARED_MAX_ENTRIES', DEFAULT_SHARED_MAX_ENTRIES):
+        cache.set(shared_chart_key(key), payload, SHARED_TIMEOUT)
@@ -0,0 +1,165 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+# Simplification tolerance (degrees, EPSG:4326) of each pre-built detail level.
+# 'full' keeps the source geometry; 0.01° is roughly 1 km at the equator.
+DETAIL_LEVELS = {
+    'low': 0.01,
+    'medium': 0.002,
+    'high': 0.0005,
+    'full': 0,
+}
+DEFAULT_DETAIL = 'medium'
+
+MANIFEST_NAME = 'manifest.json'
+
+# Artifacts loaded into this process, keyed by file path and the mtimes of
+# the file and the manifest
+_artifacts = {}
+_artifacts_lock = threading.Lock()
+
+
+def get_county_geojson_dir():
+    """Directory holding the pre-built county GeoJSON (settings.COUNTY_GEOJSON_DIR)."""
+    return getattr(settings, 'COUNTY_GEOJSON_DIR',
+                   os.path.join(settings.BASE_DIR, 'research_dashboard', 'data', 'geo'))
+
+
+def detail_for_zoom(zoom):
+    """The coarsest detail level that still looks right at a Leaflet zoom level."""
+    if zoom <= 7:
+        return 'low'
+    if zoom <= 10:
+        return 'medium'
+    if zoom <= 12:
+        return 'high'
+    return 'full'
+
+
+def _replace_file(path, content):
+    """
+    Writes `content` to a temporary file next to `path` and renames it over
+    `path`, so readers only ever see the old or the new file in full.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_variants(path, content):
+    """
+    Writes `content` to `path` with its .gz (and .br, if brotli is installed)
+    variants. The plain file goes last: readers key what they load on its
+    mtime, so by the time it changes the variants are in place.
+    """
+    _replace_file(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _replace_file(path + '.br', brotli.compress(content))
+    _replace_file(path, content)
+
+
+def build_county_geojson(frames, counties, output_dir=None):
+    """
+    Writes the county boundaries as compact GeoJSON, one file per detail
+    level, with pre-compressed variants and a manifest of their ETags.
+    Every file is replaced atomically and the manifest is written last.
+
+    Args:
+        frames (dict): GeoDataFrame (EPSG:4326) of each detail level, already
+            simplified (see AdminBoundaryIndex.query).
+        counties (list): The study counties the boundaries were selected for,
+            recorded so the artifacts can be rebuilt when they change.
+
+    Returns:
+        dict: The manifest: 'counties', and under 'details' the file name,
+        ETag and size in bytes of each detail level.
+    """
+    output_dir = output_dir or get_county_geojson_dir()
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {'counties': list(counties), 'details': {}}
+    for detail, gdf in frames.items():
+        content = gdf.to_json(drop_id=True, separators=(',', ':')).encode('utf-8')
+        filename = f'counties-{detail}.geojson'
+        _write_variants(os.path.join(output_dir, filename), content)
+        manifest['details'][detail] = {
+            'file': filename,
+            'etag': hashlib.sha256(content).hexdigest()[:32],
+            'bytes': len(content),
+        }
+
+    _replace_file(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+
+    with _artifacts_lock:
+        _artifacts.clear()
+    return manifest
+
+
+def load_county_geojson(detail=DEFAULT_DETAIL, output_dir=None):
+    """
+    The pre-built GeoJSON of one detail level, read once per process.
+
+    Returns:
+        dict: 'etag', the 'counties' it was built for and the encoded bodies
+        keyed by content coding ('identity', 'gzip' and, when it was built,
+        'br'), or None if the artifact has not been built.
+    """
+    output_dir = output_dir or get_county_geojson_dir()
+    path = os.path.join(output_dir, f'counties-{detail}.geojson')
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    try:
+        # A rebuild replaces the manifest after the files, so also reload then
+        key += (os.stat(manifest_path).st_mtime_ns,)
+    except OSError:
+        key += (None,)
+
+    with _artifacts_lock:
+        artifact = _artifacts.get(key)
+    if artifact is not None:
+        return artifact
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    try:
+        with open(manifest_path) as f:
+            counties = json.load(f).get('counties')
+    except (OSError, ValueError):
+        counties = None
+    artifact = {
+        'etag': hashlib.sha256(content).hexdigest()[:32],
+        'counties': counties,
+        'identity': content,
+    }
+    for coding, suffix in (('gzip', '.gz'), ('br', '.br')):
+        try:
+            with open(path + suffix, 'rb') as f:
+                artifact[coding] = f.read()
+        except OSError:
+            pass
+
+    with _artifacts_lock:
+        # Drop artifacts of older builds of the same file
+        for stale in [k for k in _artifacts if k[0] == path]:
+            del _artifacts[stale]
+        _artifacts[key] = artifact
+    return artifact
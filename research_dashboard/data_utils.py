@@ -1,103 +1,597 @@
-import pandas as pd
-import numpy as np
-from django.core.cache import cache
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
 
 import pandas as pd
 import numpy as np
-from django.core.cache import cache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the cleaning logic below changes, so snapshots written
+# by an older version of the pipeline are ignored and rebuilt.
+SNAPSHOT_FORMAT_VERSION = 2
+
+# CSV exports larger than this are cleaned chunk by chunk (see
+# clean_baseline_csv_chunked), reading INGEST_CHUNK_ROWS rows at a time.
+CHUNKED_INGEST_MIN_BYTES = 64 * 1024 * 1024
+INGEST_CHUNK_ROWS = 50000
+
+# REDCap's "not applicable / unknown" codes in numeric fields.
+PLACEHOLDER_VALUES = [9999.0, 99999.0, 999999.0, 9999999.0]
+
+# Staff headcount columns (blank means none) and monthly patient counts.
+STAFF_COL_KEYWORDS = ['employed', '_start', '_end', '_hiv', '_ncd', '_trained', '_left']
+PATIENT_COUNT_PREFIXES = ['outpatient_', 'hiv_', 'diabetes_', 'htn_', 'dm_htn_', 'hiv_dm_', 'hiv_htn_', 'hiv_htn_dm_']
+
+# Low-cardinality text columns stored as categoricals in the cleaned frame,
+# besides the REDCap checkbox fields (see compact_baseline_dataframe).
+CATEGORICAL_COLUMNS = [
+    'county', 'level', 'ownership', 'his_hiv', 'his_ncd',
+    'patients_hivncd_care', 'bp_monitor_available', 'glucometers_strips_available',
+]
+CHECKBOX_VALUES = {'Checked', 'Unchecked'}
+
+# Chart labels of the ownership and HIV/NCD care-model answers.
+OWNERSHIP_LABELS = {
+    "Ministry of Health": "MOH",
+    "Private Practice": "Private"
+}
+CARE_MODEL_LABELS = {
+    'HIV and NCD services are separately located and provided by different providers': 'Separate Location, Different Providers',
+    'HIV and NCD services are co-located space and provided by the same provider': 'Co-located, Same Provider',
+    'HIV and NCD services are separately located but provided by the same providers': 'Separate Location, Same Provider',
+    'HIV and NCD services are co-located but provided by different providers respectively': 'Co-located, Different Providers'
+}
+
+
+# Process-local slot for the cleaned baseline frame. The frame's numeric
+# columns are memory-mapped from the on-disk snapshot, so every worker that
+# loads it maps the same read-only pages of the OS page cache instead of
+# holding (or unpickling) a private copy. The slot is keyed on the CSV's
+# path, size and modification time (or on the snapshot path when a published
+# snapshot is mapped directly), so a replaced export is picked up.
+_baseline_slot = {'source': None, 'df': None}
+_baseline_slot_lock = threading.Lock()
+
+
+def get_baseline_csv_path():
+    """Location of the REDCap baseline export."""
+    return getattr(
+        settings, 'BASELINE_CSV_PATH',
+        os.path.join(settings.BASE_DIR, 'redcap_baseline_complete.csv')
+    )
+
 
 def load_and_clean_data(filepath=r"redcap_baseline_complete.csv"):
     """
     Loads and cleans the REDCap facility data.
-    This function is cached to avoid expensive re-processing on every call.
+
+    The cleaned frame is read from a columnar on-disk snapshot keyed by the
+    CSV's content hash and kept in a process-local slot. The CSV is only
+    parsed and cleaned when no snapshot exists for its current contents.
     """
-    cache_key = 'cleaned_redcap_dataframe'
-    
-    # Try to get the data from the cache first
-    df = cache.get(cache_key)
-    
-    # --- CACHE HIT ---
-    # If the dataframe is found, return it immediately.
-    if df is not None:
-        # print("--- Loading Cleaned DataFrame from CACHE ---")
-        return df
-        
-    # --- CACHE MISS ---
-    # If not in cache, run the expensive cleaning process.
-    # print("--- Starting Data Loading and Cleaning (Cache Miss) ---")
-    
-    try:
-        df = pd.read_csv(filepath)
-    except FileNotFoundError:
+    if not os.path.exists(filepath):
         # print(f"Error: Data file not found at {filepath}")
         return None
 
-    # --- Initial Cleaning ---
-    if 'Unnamed: 0' in df.columns:
-        df.drop(columns=['Unnamed: 0'], inplace=True)
-    
-    # --- All of your cleaning logic remains here ---
-    staff_col_keywords = ['employed', '_start', '_end', '_hiv', '_ncd', '_trained', '_left']
-    cols_to_convert = [
-        col for col in df.columns 
-        if any(keyword in col for keyword in staff_col_keywords) and df[col].dtype == 'float64'
-    ]
-    df[cols_to_convert] = df[cols_to_convert].fillna(0).astype(int)
-    
-    placeholders_to_replace = [9999.0, 99999.0, 999999.0, 9999999.0]
-    numeric_cols = df.select_dtypes(include=np.number).columns
-    for col in numeric_cols:
-        df[col] = df[col].replace(placeholders_to_replace, np.nan)
-        
-    patient_count_prefixes = ['outpatient_', 'hiv_', 'diabetes_', 'htn_', 'dm_htn_', 'hiv_dm_', 'hiv_htn_', 'hiv_htn_dm_']
-    all_patient_cols = [col for col in df.columns if any(col.startswith(p) for p in patient_count_prefixes)]
-    for col in all_patient_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-    numerical_cols_to_impute = [col for col in all_patient_cols if df[col].isnull().any()]
-    for col in numerical_cols_to_impute:
-        # Check if column has any non-NaN values
-        if not df[col].dropna().empty:
-            median_value = df[col].median()
-        else:
-            median_value = 0
-        df[col] = df[col].fillna(median_value)
-    
-    # print("--- Data Cleaning Logic Complete ---")
-
-    # (Minor improvement: Combine replaces into one call with a dictionary)
-    df['ownership'] = df['ownership'].replace({
-        "Ministry of Health": "MOH",
-        "Private Practice": "Private"
-    })
-
-    cols_to_update = ['his_hiv', 'his_ncd']
-    for col in cols_to_update:
-        conditions = [
-            df[col].str.contains('emr', case=False, na=False),
-            df[col].str.contains('paper', case=False, na=False)
-        ]
-        choices = ['EMR Based', 'Paper Based']
-        df[col] = np.select(conditions, choices, default=df[col])
-
-    # 1. Define the mapping from old text to new text
-    care_model_map = {
-        'HIV and NCD services are separately located and provided by different providers': 'Separate Location, Different Providers',
-        'HIV and NCD services are co-located space and provided by the same provider': 'Co-located, Same Provider',
-        'HIV and NCD services are separately located but provided by the same providers': 'Separate Location, Same Provider',
-        'HIV and NCD services are co-located but provided by different providers respectively': 'Co-located, Different Providers'
-    }
+    stat = os.stat(filepath)
+    source = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+
+    with _baseline_slot_lock:
+        if _baseline_slot['source'] == source:
+            return _baseline_slot['df']
+
+        snapshot_path, df = prepare_snapshot(filepath)
+        if df is None:
+            df = load_snapshot(snapshot_path)
+        if df is None:
+            # The snapshot exists but cannot be read, clean in memory instead.
+            df = clean_baseline_dataframe(pd.read_csv(filepath))
+
+        _baseline_slot['source'] = source
+        _baseline_slot['df'] = df
+    return df
+
+
+def prepare_snapshot(filepath, content_hash=None):
+    """
+    Makes sure a snapshot of the cleaned CSV exists, cleaning it if needed.
+    Pass `content_hash` when the caller has already hashed the file.
+
+    Returns:
+        tuple: (snapshot path, cleaned DataFrame). The DataFrame is only
+        returned when the snapshot could not be written, so the caller can
+        fall back to the in-memory frame.
+    """
+    snapshot_path = get_snapshot_path(content_hash or file_content_hash(filepath))
+    if os.path.exists(os.path.join(snapshot_path, 'meta.json')):
+        return snapshot_path, None
+
+    # No snapshot for this CSV yet, run the expensive cleaning process.
+    chunked_min_bytes = getattr(settings, 'BASELINE_CHUNKED_INGEST_MIN_BYTES', CHUNKED_INGEST_MIN_BYTES)
+    if os.path.getsize(filepath) > chunked_min_bytes:
+        df = clean_baseline_csv_chunked(filepath)
+    else:
+        df = clean_baseline_dataframe(pd.read_csv(filepath))
+    if write_snapshot(df, snapshot_path):
+        return snapshot_path, None
+    return snapshot_path, df
+
+
+def map_snapshot(snapshot_path):
+    """
+    Loads the baseline frame from an already published snapshot into this
+    process's slot, without ever parsing or cleaning the CSV.
 
-    # 2. Apply the replacement to the column
-    df['patients_hivncd_care'] = df['patients_hivncd_care'].replace(care_model_map)
+    Returns:
+        pd.DataFrame or None: None if the snapshot cannot be read.
+    """
+    source = ('snapshot', snapshot_path)
+    with _baseline_slot_lock:
+        if _baseline_slot['source'] == source:
+            return _baseline_slot['df']
+        df = load_snapshot(snapshot_path)
+        if df is not None:
+            _baseline_slot['source'] = source
+            _baseline_slot['df'] = df
+    return df
+
+
+def release_baseline_data():
+    """Drops this process's reference to the baseline frame."""
+    with _baseline_slot_lock:
+        _baseline_slot['source'] = None
+        _baseline_slot['df'] = None
+
+
+def clean_baseline_dataframe(df):
+    """
+    Applies the REDCap cleaning steps to a freshly parsed baseline DataFrame.
+
+    Every step works on the plain array of each column and the cleaned,
+    compacted frame is built once at the end, so columns no step changes
+    are never copied and no intermediate frame is materialised.
+
+    Args:
+        df (pd.DataFrame): The raw frame as returned by pd.read_csv.
+
+    Returns:
+        pd.DataFrame: The cleaned frame, in its compact schema.
+    """
+    data = _column_arrays(df)
+    data.pop('Unnamed: 0', None)
+
+    _fill_staff_columns(data)
+    _replace_placeholders(data)
+
+    # Coerce the patient-count columns; columns pandas already parsed as
+    # numbers are left untouched.
+    patient_cols = _patient_count_columns(data)
+    _coerce_numeric(data, patient_cols)
+
+    # Impute missing patient counts with each column's median. Columns with
+    # no values get 0.
+    for col in patient_cols:
+        values = data[col]
+        missing = np.isnan(values)
+        if missing.any():
+            median = np.median(values[~missing]) if not missing.all() else 0.0
+            data[col] = np.where(missing, median, values)
+
+    _recode_text_columns(data)
+    return _compact_frame(data, df.index)
+
+
+def clean_baseline_csv_chunked(filepath, chunksize=None):
+    """
+    Cleans a large REDCap export without parsing it in one go.
+
+    Produces the same frame as clean_baseline_dataframe(pd.read_csv(filepath)).
+    The file is read twice, `chunksize` rows at a time:
+
+    1. A scan pass works out each column's dtype (as a whole-file parse would
+       infer it) and a value histogram of every patient-count column, from
+       which the imputation medians are taken.
+    2. A cleaning pass parses each chunk with those explicit dtypes, cleans
+       it and encodes its text columns as categoricals.
+
+    Parsing never holds more than one raw chunk, so peak memory is bounded by
+    the chunk size plus the (compact) cleaned result.
+    """
+    chunksize = chunksize or getattr(settings, 'BASELINE_INGEST_CHUNK_ROWS', INGEST_CHUNK_ROWS)
+    dtypes, medians = _scan_baseline_csv(filepath, chunksize)
+
+    # county and level need no recoding, so they are parsed straight into
+    # categoricals; the other text columns are encoded once recoded.
+    parse_dtypes = dict(dtypes, county='category', level='category')
+    categorical_cols = [col for col in CATEGORICAL_COLUMNS if col in dtypes]
+    chunks = []
+    for chunk in pd.read_csv(filepath, chunksize=chunksize, dtype=parse_dtypes):
+        data = _column_arrays(chunk)
+        data.pop('Unnamed: 0', None)
+        _fill_staff_columns(data)
+        _replace_placeholders(data)
+        patient_cols = _patient_count_columns(data)
+        _coerce_numeric(data, patient_cols)
+        for col in patient_cols:
+            missing = np.isnan(data[col])
+            if missing.any():
+                data[col] = np.where(missing, medians[col], data[col])
+        _recode_text_columns(data)
+        for col in categorical_cols:
+            data[col] = pd.Categorical(data[col])
+        chunks.append(pd.DataFrame(data, index=chunk.index))
+
+    # Give every chunk the same categories so the concatenation keeps them.
+    for col in categorical_cols:
+        categories = sorted(set().union(*(chunk[col].cat.categories for chunk in chunks)))
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return compact_baseline_dataframe(pd.concat(chunks, ignore_index=True))
+
+
+def compact_baseline_dataframe(df):
+    """
+    Returns a cleaned frame in its compact schema.
 
-    # --- FINAL STEP BEFORE RETURNING ---
-    # Set the fully cleaned DataFrame in the cache.
-    # This is OUTSIDE the for loop, but still INSIDE the "cache miss" block.
-    # print("--- Storing Cleaned DataFrame in Cache ---")
-    cache.set(cache_key, df, timeout=3600) # timeout is 1 hour
+    - CATEGORICAL_COLUMNS and the checkbox fields ('Checked'/'Unchecked')
+      become categoricals with sorted categories, so filters and group-bys
+      work on small integer codes.
+    - Integer-valued numeric columns without missing values are stored in
+      the smallest integer dtype that fits them.
 
+    The per-column memory before and after is logged at debug level.
+    """
+    return _compact_frame(_column_arrays(df), df.index)
+
+
+def _compact_frame(data, index):
+    """
+    Builds the compact frame (see compact_baseline_dataframe) from a dict of
+    cleaned column arrays, converting one column at a time.
+    """
+    # Measuring object columns walks every string, so only when it is logged
+    report_memory = logger.isEnabledFor(logging.INFO)
+    if report_memory:
+        before = pd.Series({col: _column_memory(values) for col, values in data.items()}, dtype=np.int64)
+
+    for col, values in data.items():
+        data[col] = _compact_column(col, values)
+    df = pd.DataFrame(data, index=index, copy=False)
+
+    if report_memory:
+        report = memory_report(before, df.memory_usage(index=False, deep=True))
+        logger.debug(f"Baseline frame memory by column (bytes):\n{report.to_string()}")
+        logger.info(
+            f"Compacted baseline frame from {report['before'].sum() / 1e6:.2f} MB "
+            f"to {report['after'].sum() / 1e6:.2f} MB"
+        )
     return df
+
+
+def _compact_column(col, values):
+    """The compact form of one cleaned column's array."""
+    if values.dtype == object:
+        if col in CATEGORICAL_COLUMNS or _is_checkbox_column(values):
+            return pd.Categorical(values)
+        return values
+    if values.dtype.kind not in 'iuf' or not len(values):
+        return values
+    if values.dtype.kind == 'f' and not (np.isfinite(values).all() and (values == np.floor(values)).all()):
+        return values
+    dtype = _smallest_int_dtype(values.min(), values.max())
+    return values if values.dtype == dtype else values.astype(dtype)
+
+
+def _is_checkbox_column(values):
+    """Whether an object column holds only REDCap checkbox answers (and blanks)."""
+    answers = pd.unique(values[pd.notna(values)])
+    return len(answers) > 0 and set(answers) <= CHECKBOX_VALUES
+
+
+def _column_memory(values):
+    """Bytes held by a column array, counting the strings of object columns."""
+    return pd.Series(values, copy=False).memory_usage(index=False, deep=True)
+
+
+def _smallest_int_dtype(low, high):
+    """The smallest signed integer dtype holding every value in [low, high]."""
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def memory_report(before, after):
+    """
+    Per-column memory of a frame before and after a dtype change.
+
+    Args:
+        before, after (pd.Series): DataFrame.memory_usage(deep=True) results.
+
+    Returns:
+        pd.DataFrame: 'before', 'after' and 'ratio' columns, largest first.
+    """
+    report = pd.DataFrame({'before': before, 'after': after})
+    report['ratio'] = report['before'] / report['after']
+    return report.sort_values('before', ascending=False)
+
+
+def _scan_baseline_csv(filepath, chunksize):
+    """
+    First pass of clean_baseline_csv_chunked.
+
+    Returns:
+        tuple: (dtypes, medians). `dtypes` maps every column to the dtype a
+        whole-file parse infers for it; `medians` holds the imputation median
+        of each patient-count column, as clean_baseline_dataframe computes it.
+    """
+    dtypes = {}
+    histograms = {}
+    missing_counts = {}
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        for col in chunk.columns:
+            dtypes[col] = _merge_dtypes(dtypes.get(col), chunk[col].dtype)
+        for col in _patient_count_columns(chunk.columns):
+            values = pd.to_numeric(chunk[col], errors='coerce')
+            counts = values.value_counts()
+            histograms[col] = counts if col not in histograms else histograms[col].add(counts, fill_value=0)
+            missing_counts[col] = missing_counts.get(col, 0) + int(values.isna().sum())
+
+    medians = {}
+    for col, counts in histograms.items():
+        dtype = dtypes[col]
+        if any(keyword in col for keyword in STAFF_COL_KEYWORDS) and dtype == 'float64':
+            # Mirrors _fill_staff_columns: blanks become 0, values are truncated.
+            counts = counts.groupby(np.trunc(counts.index)).sum()
+            counts = counts.add(pd.Series({0.0: missing_counts[col]}), fill_value=0)
+        if dtype != 'object':
+            counts = counts[~counts.index.isin(PLACEHOLDER_VALUES)]
+        medians[col] = _histogram_median(counts)
+    return dtypes, pd.Series(medians, dtype=np.float64)
+
+
+def _merge_dtypes(current, dtype):
+    """Widens a column's dtype the way pandas does across parsed chunks."""
+    dtype = np.dtype(dtype).name
+    if current is None or current == dtype:
+        return dtype
+    if {current, dtype} == {'int64', 'float64'}:
+        return 'float64'
+    return 'object'
+
+
+def _histogram_median(counts):
+    """
+    Median of the values in a value -> count histogram, matching
+    Series.median(). An empty histogram gives 0, like an all-missing column.
+    """
+    counts = counts[counts > 0].sort_index()
+    total = int(counts.sum())
+    if total == 0:
+        return 0.0
+    positions = counts.cumsum().to_numpy()
+    values = counts.index.to_numpy(dtype=np.float64)
+    lower = values[np.searchsorted(positions, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(positions, total // 2, side='right')]
+    return (lower + upper) / 2
+
+
+def _column_arrays(df):
+    """
+    The columns of `df` as a dict of their underlying arrays, without copying.
+    Extension columns (categoricals) keep their pandas array.
+    """
+    return {
+        col: series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+        for col, series in df.items()
+    }
+
+
+def _fill_staff_columns(data):
+    """Staff headcounts left blank mean none: fill with 0 and store as int."""
+    for col, values in data.items():
+        if any(keyword in col for keyword in STAFF_COL_KEYWORDS) and values.dtype == np.float64:
+            data[col] = np.where(np.isnan(values), 0, values).astype(np.int64)
+
+
+def _replace_placeholders(data):
+    """
+    Replaces placeholders with NaN in the numeric columns. Only the columns
+    that actually contain a placeholder are rewritten (and so become float),
+    exactly as Series.replace would.
+    """
+    for col, values in data.items():
+        if values.dtype.kind in 'iuf':
+            placeholder_mask = np.isin(values, PLACEHOLDER_VALUES)
+            if placeholder_mask.any():
+                values = values.astype(np.float64)
+                values[placeholder_mask] = np.nan
+                data[col] = values
+
+
+def _patient_count_columns(columns):
+    """The monthly patient-count columns among `columns`."""
+    return pd.Index([col for col in columns if any(col.startswith(p) for p in PATIENT_COUNT_PREFIXES)])
+
+
+def _coerce_numeric(data, columns):
+    """Coerces the non-numeric columns among `columns` to numbers."""
+    for col in columns:
+        if not pd.api.types.is_numeric_dtype(data[col].dtype):
+            data[col] = pd.to_numeric(data[col], errors='coerce')
+
+
+def _recode_text_columns(data):
+    """Shortens the ownership, HIS and care-model answers to chart labels."""
+    data['ownership'] = _relabel(data['ownership'], lambda answer: OWNERSHIP_LABELS.get(answer, answer))
+    for col in ['his_hiv', 'his_ncd']:
+        data[col] = _relabel(data[col], _his_label)
+    data['patients_hivncd_care'] = _relabel(
+        data['patients_hivncd_care'], lambda answer: CARE_MODEL_LABELS.get(answer, answer)
+    )
+
+
+def _his_label(answer):
+    """'EMR Based' or 'Paper Based' for HIS answers mentioning either, else the answer."""
+    if isinstance(answer, str):
+        if 'emr' in answer.lower():
+            return 'EMR Based'
+        if 'paper' in answer.lower():
+            return 'Paper Based'
+    return answer
+
+
+def _relabel(values, relabel):
+    """
+    Applies `relabel` to every distinct value of a text column instead of to
+    every row. Missing values are kept as they are.
+    """
+    codes, answers = pd.factorize(values)
+    labels = np.array([relabel(answer) for answer in answers] + [None], dtype=object)
+    result = labels[codes]
+    missing = codes < 0
+    if missing.any():
+        result[missing] = np.asarray(values, dtype=object)[missing]
+    return result
+
+
+# ===============================================================
+# Columnar on-disk snapshots
+# ===============================================================
+# A snapshot is a directory holding one .npy file per column plus a
+# meta.json describing the column order and how to rebuild each column.
+# Numeric columns are loaded with mmap_mode='r', so every worker process
+# maps the same read-only pages instead of holding its own parsed copy.
+# Categorical columns are stored as their (mapped) codes plus categories;
+# other text columns as integer codes decoded back to objects on load.
+
+def get_snapshot_dir():
+    """Directory where cleaned baseline snapshots are written."""
+    return getattr(
+        settings, 'BASELINE_SNAPSHOT_DIR',
+        os.path.join(settings.BASE_DIR, 'research_dashboard', 'data', 'snapshots')
+    )
+
+
+def get_snapshot_path(content_hash, name='cleaned'):
+    """Snapshot location for a given CSV content hash and table name."""
+    return os.path.join(
+        get_snapshot_dir(), f"{name}-{content_hash[:16]}-v{SNAPSHOT_FORMAT_VERSION}"
+    )
+
+
+def file_content_hash(filepath, chunk_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_snapshot(df, path):
+    """
+    Writes a DataFrame to `path` as a columnar snapshot.
+
+    The snapshot is built in a temporary directory and renamed into place,
+    so readers never observe a half-written snapshot. If another process
+    published the same snapshot first, its copy is kept.
+
+    Returns:
+        bool: True if the snapshot exists at `path` afterwards.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        columns = []
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            entry = {'name': col, 'file': f'{i}.npy'}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry['kind'] = 'category'
+                entry['categories'] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy()
+            elif series.dtype.kind in 'biufmM':
+                entry['kind'] = 'numeric'
+                values = series.to_numpy()
+            else:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                entry['kind'] = 'object'
+                entry['categories'] = uniques.tolist()
+                values = codes.astype(np.int32)
+            np.save(os.path.join(tmp_path, entry['file']), values, allow_pickle=False)
+            columns.append(entry)
+
+        meta = {'format': SNAPSHOT_FORMAT_VERSION, 'rows': len(df), 'columns': columns}
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another worker published this snapshot while we were writing it.
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        _prune_snapshots(path)
+        return os.path.isdir(path)
+    except Exception as e:
+        logger.warning(f"Could not write baseline snapshot to {path}: {str(e)}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return False
+
+
+def _prune_snapshots(keep_path):
+    """Removes older snapshots of the same table, keeping `keep_path`."""
+    snapshot_dir, keep_name = os.path.split(keep_path)
+    table_prefix = keep_name.split('-')[0] + '-'
+    for entry in os.listdir(snapshot_dir):
+        if entry != keep_name and entry.startswith(table_prefix) and '.tmp-' not in entry:
+            # Workers that still map the old files keep their pages until they
+            # reload; on Windows the delete may fail and is retried next time.
+            shutil.rmtree(os.path.join(snapshot_dir, entry), ignore_errors=True)
+
+
+def load_snapshot(path):
+    """
+    Loads a columnar snapshot written by write_snapshot.
+
+    Numeric columns and categorical codes are memory-mapped read-only and
+    wrapped without copying.
+
+    Returns:
+        pd.DataFrame or None: None if the snapshot is missing or unreadable.
+    """
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('format') != SNAPSHOT_FORMAT_VERSION:
+            return None
+
+        data = {}
+        for entry in meta['columns']:
+            # np.asarray drops the memmap subclass but keeps the mapped buffer.
+            values = np.asarray(np.load(os.path.join(path, entry['file']), mmap_mode='r'))
+            if entry['kind'] == 'category':
+                # The codes stay memory-mapped; only the categories are per process.
+                values = pd.Categorical.from_codes(values, categories=entry['categories'])
+            elif entry['kind'] == 'object':
+                # The trailing NaN makes the -1 "missing" code decode to NaN.
+                categories = np.array(entry['categories'] + [np.nan], dtype=object)
+                values = categories[values]
+            data[entry['name']] = values
+        return pd.DataFrame(data, copy=False)
+    except Exception as e:
+        logger.warning(f"Could not load baseline snapshot from {path}: {str(e)}")
+        return None
 # In the same file, e.g., your_app/data_utils.py
 
 def create_average_df(df):
@@ -0,0 +1,156 @@
+import hashlib
+import logging
+
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from .county_geojson import (
+    DEFAULT_DETAIL, DETAIL_LEVELS, build_county_geojson, detail_for_zoom, load_county_geojson,
+)
+
+logger = logging.getLogger(__name__)
+
+# The boundaries only change when the artifacts are rebuilt, and browsers
+# revalidate cheaply against the ETag after this.
+COUNTY_BOUNDARIES_MAX_AGE = 86400
+
+
+def get_county_geodata():
+    """The study counties' boundaries (full detail), or an empty frame if they cannot be loaded."""
+    # geopandas is only needed to query the boundaries or (re)build the
+    # artifacts; serving the pre-built county GeoJSON is a plain byte copy.
+    import geopandas as gpd
+    from .boundaries import get_boundary_index, get_study_counties
+
+    try:
+        return get_boundary_index().query(level=1, counties=get_study_counties())
+    except Exception as e:
+        logger.error(f"Error loading county data: {str(e)}")
+        return gpd.GeoDataFrame([], columns=['name', 'geometry'])
+
+
+def get_county_geojson(detail=DEFAULT_DETAIL):
+    """
+    The pre-built GeoJSON of the study counties at a detail level, (re)building
+    the artifacts first if they are missing or were built for other counties.
+    One worker on the host builds them at a time; the others wait for it and
+    then serve its build. Returns None if the boundaries cannot be loaded.
+    """
+    from .baseline_data import RebuildLock
+    from .boundaries import get_boundary_index, get_study_counties
+
+    counties = get_study_counties()
+    artifact = load_county_geojson(detail)
+    if artifact is not None and artifact['counties'] == counties:
+        return artifact
+
+    lock = RebuildLock('county_geojson')
+    lock.acquire()
+    try:
+        # The previous holder may have just built them
+        artifact = load_county_geojson(detail)
+        if artifact is not None and artifact['counties'] == counties:
+            return artifact
+
+        logger.warning("County GeoJSON artifacts missing or stale; building them now")
+        try:
+            index = get_boundary_index()
+            build_county_geojson({
+                name: index.query(level=1, counties=counties, detail=name) for name in DETAIL_LEVELS
+            }, counties)
+        except Exception as e:
+            logger.error(f"Error building county GeoJSON: {str(e)}")
+            return None
+    finally:
+        lock.release()
+    return load_county_geojson(detail)
+
+
+def _accepted_encoding(request, bodies):
+    """The best pre-compressed variant in `bodies` the client accepts."""
+    accepted = {
+        part.split(';')[0].strip().lower()
+        for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+    for coding in ('br', 'gzip'):
+        if coding in accepted and coding in bodies:
+            return coding
+    return 'identity'
+
+
+def _geojson_response(request, bodies, etag):
+    """
+    GeoJSON response with a strong ETag, answering If-None-Match with a 304.
+    `bodies` maps content codings to the encoded body ('identity' is required).
+    """
+    coding = _accepted_encoding(request, bodies)
+    # Each content coding is a different representation, so gets its own strong ETag
+    etag = f'"{etag}"' if coding == 'identity' else f'"{etag}-{coding}"'
+
+    if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(bodies[coding], content_type='application/geo+json')
+        if coding != 'identity':
+            response['Content-Encoding'] = coding
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={COUNTY_BOUNDARIES_MAX_AGE}'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def county_boundaries_api(request):
+    """
+    API endpoint that returns admin boundaries of the study counties as GeoJSON.
+
+    Query parameters:
+        level: 0 (country), 1 (counties, the default) or 2 (sub-counties).
+        names: Comma-separated feature names to keep.
+        bbox: min lon,min lat,max lon,max lat; only features intersecting it.
+        detail: low|medium|high|full, or zoom= to pick one for a map zoom level.
+
+    The plain county request is served from the pre-built artifact (with its
+    gzip/brotli variant when the client accepts one); other requests query
+    the boundary index.
+    """
+    detail = request.GET.get('detail')
+    if detail is None and request.GET.get('zoom', '').isdigit():
+        detail = detail_for_zoom(int(request.GET['zoom']))
+    detail = detail or DEFAULT_DETAIL
+    if detail not in DETAIL_LEVELS:
+        return JsonResponse({"error": f"Unknown detail level '{detail}'"}, status=400)
+
+    level = request.GET.get('level', '1')
+    if level not in ('0', '1', '2'):
+        return JsonResponse({"error": "level must be 0, 1 or 2"}, status=400)
+    level = int(level)
+
+    names = [name.strip() for name in request.GET.get('names', '').split(',') if name.strip()]
+
+    bbox = None
+    if request.GET.get('bbox'):
+        try:
+            bbox = tuple(float(value) for value in request.GET['bbox'].split(','))
+        except ValueError:
+            bbox = ()
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return JsonResponse({"error": "bbox must be min lon,min lat,max lon,max lat"}, status=400)
+
+    if level == 1 and not names and bbox is None:
+        artifact = get_county_geojson(detail)
+        if artifact is None:
+            return JsonResponse({"error": "County boundary data could not be loaded"}, status=500)
+        return _geojson_response(request, artifact, artifact['etag'])
+
+    from .boundaries import get_boundary_index, get_study_counties
+
+    try:
+        gdf = get_boundary_index().query(
+            level=level, counties=get_study_counties(), names=names, bbox=bbox, detail=detail
+        )
+    except Exception as e:
+        logger.error(f"Error querying admin boundaries: {str(e)}")
+        return JsonResponse({"error": "County boundary data could not be loaded"}, status=500)
+
+    content = gdf.to_json(drop_id=True, separators=(',', ':')).encode('utf-8')
+    return _geojson_response(request, {'identity': content}, hashlib.sha256(content).hexdigest()[:32])
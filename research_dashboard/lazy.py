@@ -0,0 +1,24 @@
+from django.utils.module_loading import import_string
+
+
+def lazy_view(dotted_path, **initkwargs):
+    """
+    URLconf entry for a view whose module is only imported when the view is
+    first requested, so that loading the URLconf (every worker boot and
+    management command) does not pay for its heavy dependencies.
+
+    `dotted_path` names a view function or a class-based view; `initkwargs`
+    are passed to as_view() for the latter.
+    """
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            target = import_string(dotted_path)
+            view = target.as_view(**initkwargs) if isinstance(target, type) else target
+        return view(request, *args, **kwargs)
+
+    wrapper.__name__ = dotted_path.rsplit('.', 1)[-1]
+    wrapper.__qualname__ = wrapper.__name__
+    return wrapper
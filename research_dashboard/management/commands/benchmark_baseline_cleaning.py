@@ -0,0 +1,159 @@
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from research_dashboard.data_utils import clean_baseline_dataframe, compact_baseline_dataframe
+
+
+MONTHS = ['jan', 'feb', 'march', 'april', 'may', 'june', 'july', 'august',
+          'september', 'october', 'november', 'december']
+PATIENT_COUNT_PREFIXES = ['outpatient_', 'hiv_', 'diabetes_', 'htn_', 'dm_htn_', 'hiv_dm_', 'hiv_htn_', 'hiv_htn_dm_']
+
+
+def reference_clean(df):
+    """
+    The original column-by-column cleaning loop, kept here as the
+    reference the vectorized clean_baseline_dataframe is checked against.
+    """
+    if 'Unnamed: 0' in df.columns:
+        df.drop(columns=['Unnamed: 0'], inplace=True)
+
+    staff_col_keywords = ['employed', '_start', '_end', '_hiv', '_ncd', '_trained', '_left']
+    cols_to_convert = [
+        col for col in df.columns
+        if any(keyword in col for keyword in staff_col_keywords) and df[col].dtype == 'float64'
+    ]
+    df[cols_to_convert] = df[cols_to_convert].fillna(0).astype(int)
+
+    placeholders_to_replace = [9999.0, 99999.0, 999999.0, 9999999.0]
+    numeric_cols = df.select_dtypes(include=np.number).columns
+    for col in numeric_cols:
+        df[col] = df[col].replace(placeholders_to_replace, np.nan)
+
+    all_patient_cols = [col for col in df.columns if any(col.startswith(p) for p in PATIENT_COUNT_PREFIXES)]
+    for col in all_patient_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    numerical_cols_to_impute = [col for col in all_patient_cols if df[col].isnull().any()]
+    for col in numerical_cols_to_impute:
+        if not df[col].dropna().empty:
+            median_value = df[col].median()
+        else:
+            median_value = 0
+        df[col] = df[col].fillna(median_value)
+
+    df['ownership'] = df['ownership'].replace({
+        "Ministry of Health": "MOH",
+        "Private Practice": "Private"
+    })
+
+    for col in ['his_hiv', 'his_ncd']:
+        conditions = [
+            df[col].str.contains('emr', case=False, na=False),
+            df[col].str.contains('paper', case=False, na=False)
+        ]
+        df[col] = np.select(conditions, ['EMR Based', 'Paper Based'], default=df[col])
+
+    df['patients_hivncd_care'] = df['patients_hivncd_care'].replace({
+        'HIV and NCD services are separately located and provided by different providers': 'Separate Location, Different Providers',
+        'HIV and NCD services are co-located space and provided by the same provider': 'Co-located, Same Provider',
+        'HIV and NCD services are separately located but provided by the same providers': 'Separate Location, Same Provider',
+        'HIV and NCD services are co-located but provided by different providers respectively': 'Co-located, Different Providers'
+    })
+    return df
+
+
+def synthetic_export(facilities, months, seed=0):
+    """
+    Builds a raw frame shaped like a REDCap baseline export, including
+    missing values, 9999-style placeholders and a text-typed count column.
+    """
+    rng = np.random.default_rng(seed)
+    data = {
+        'Unnamed: 0': np.arange(facilities),
+        'facility_mfl': np.arange(10000, 10000 + facilities),
+        'facility_name': [f'Facility {i}' for i in range(facilities)],
+        'county': rng.choice(['Nairobi', 'Kiambu', 'Kitui'], facilities),
+        'level': rng.choice(['Level 2', 'Level 3', 'Level 4'], facilities),
+        'ownership': rng.choice(['Ministry of Health', 'Private Practice', 'Faith Based'], facilities),
+    }
+
+    def counts(high, missing=0.05, placeholder=0.01):
+        values = rng.integers(0, high, facilities).astype(float)
+        values[rng.random(facilities) < missing] = np.nan
+        values[rng.random(facilities) < placeholder] = 9999
+        return values
+
+    for cadre in ['nurse', 'co', 'lab_tech', 'doc', 'hts_counsellors', 'pharmaceutical', 'nutritionist', 'pharmacist']:
+        data[f'employed_{cadre}'] = counts(20, missing=0.1)
+    month_names = [MONTHS[i % 12] if i < 12 else f'{MONTHS[i % 12]}{i // 12}' for i in range(months)]
+    for prefix in PATIENT_COUNT_PREFIXES:
+        for month in month_names:
+            data[f'{prefix}{month}'] = counts(500)
+    text_counts = rng.integers(0, 50, facilities).astype(str).astype(object)
+    text_counts[rng.random(facilities) < 0.1] = 'n/a'
+    data['outpatient_reported'] = text_counts
+
+    data['his_hiv'] = rng.choice(['KenyaEMR', 'Paper registers', 'Other', None], facilities)
+    data['his_ncd'] = rng.choice(['EMR system', 'paper', 'DHIS', None], facilities)
+    data['patients_hivncd_care'] = rng.choice([
+        'HIV and NCD services are separately located and provided by different providers',
+        'HIV and NCD services are co-located space and provided by the same provider',
+    ], facilities)
+    for col in ['total_expenditure_year', 'total_expenditure_hiv', 'total_expenditure_ncd']:
+        data[col] = counts(1000000, missing=0.1, placeholder=0.1)
+    return pd.DataFrame(data)
+
+
+class Command(BaseCommand):
+    help = ("Benchmarks clean_baseline_dataframe against the original column-by-column "
+            "cleaning loop and checks that both produce identical frames.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', help='Benchmark a real REDCap export instead of synthetic data.')
+        parser.add_argument('--facilities', type=int, default=20000, help='Synthetic rows (default: 20000).')
+        parser.add_argument('--months', type=int, default=36,
+                            help='Synthetic monthly columns per condition (default: 36).')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per implementation (default: 3).')
+
+    def handle(self, *args, **options):
+        if options['csv']:
+            raw = pd.read_csv(options['csv'])
+        else:
+            raw = synthetic_export(options['facilities'], options['months'])
+        self.stdout.write(f"Raw frame: {raw.shape[0]} rows x {raw.shape[1]} columns")
+
+        results = {}
+        outputs = {}
+        # clean_baseline_dataframe also compacts the dtypes of its result, so
+        # the reference output is compacted the same way before comparing.
+        implementations = (
+            ('reference', lambda df: compact_baseline_dataframe(reference_clean(df))),
+            ('vectorized', clean_baseline_dataframe),
+        )
+        for label, clean in implementations:
+            timings = []
+            for _ in range(options['repeat']):
+                frame = raw.copy()
+                start = time.perf_counter()
+                outputs[label] = clean(frame)
+                timings.append(time.perf_counter() - start)
+
+            frame = raw.copy()
+            tracemalloc.start()
+            clean(frame)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[label] = (min(timings), peak)
+            self.stdout.write(f"{label:>10}: best {min(timings) * 1000:8.1f} ms, peak {peak / 2**20:8.1f} MiB")
+
+        try:
+            pd.testing.assert_frame_equal(outputs['vectorized'], outputs['reference'])
+        except AssertionError as e:
+            raise CommandError(f"Vectorized cleaning output differs from the reference: {e}")
+
+        speedup = results['reference'][0] / results['vectorized'][0]
+        self.stdout.write(self.style.SUCCESS(f"Outputs are identical; vectorized cleaning is {speedup:.1f}x faster."))
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Analytics libraries the URLconf must not import; the baseline and geo views
+# that need them are loaded lazily (see research_dashboard.lazy).
+HEAVY_PACKAGES = ['pandas', 'numpy', 'plotly', 'geopandas', 'shapely', 'pyproj']
+
+
+def measure_import_time(module):
+    """
+    Imports `module` after django.setup() in a fresh interpreter run with
+    `python -X importtime`.
+
+    Returns:
+        list: (module name, self µs, cumulative µs) for every module imported.
+    """
+    code = f"import django; django.setup(); import {module}"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise CommandError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+class Command(BaseCommand):
+    help = ("Measures the import time of the URLconf (what every worker boot and management "
+            "command pays) with python -X importtime, and fails if it pulls in the analytics "
+            "libraries or exceeds a time budget.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default=settings.ROOT_URLCONF,
+                            help='Module to import (default: the root URLconf).')
+        parser.add_argument('--budget-ms', type=float,
+                            help='Fail if the total import time exceeds this many milliseconds.')
+        parser.add_argument('--top', type=int, default=10, help='Slowest modules to list (default: 10).')
+
+    def handle(self, *args, **options):
+        timings = measure_import_time(options['module'])
+        total_ms = sum(self_us for _, self_us, _ in timings) / 1000
+        self.stdout.write(f"Imported {len(timings)} modules in {total_ms:.0f} ms. Slowest (cumulative):")
+        for name, _, cumulative_us in sorted(timings, key=lambda t: t[2], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        heavy = sorted({name.split('.')[0] for name, _, _ in timings} & set(HEAVY_PACKAGES))
+        if heavy:
+            raise CommandError(
+                f"Importing {options['module']} loads analytics packages: {', '.join(heavy)}. "
+                f"Import them inside the views that use them instead."
+            )
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            raise CommandError(f"Import time {total_ms:.0f} ms exceeds the {options['budget_ms']:.0f} ms budget.")
+
+        self.stdout.write(self.style.SUCCESS("No analytics packages are imported at startup."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from research_dashboard.baseline_data import RebuildLock
+from research_dashboard.boundaries import get_boundary_index, get_study_counties
+from research_dashboard.county_geojson import DETAIL_LEVELS, brotli, build_county_geojson, get_county_geojson_dir
+
+
+class Command(BaseCommand):
+    help = ("Pre-builds the county boundary GeoJSON served by the map: the study counties "
+            "(settings.STUDY_COUNTIES, or the counties in the baseline data), simplified at "
+            "every detail level, with gzip (and brotli, if installed) variants.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Where to write the files (default: settings.COUNTY_GEOJSON_DIR).')
+
+    def handle(self, *args, **options):
+        try:
+            index = get_boundary_index()
+        except Exception as e:
+            raise CommandError(f"Admin boundaries could not be loaded: {e}")
+
+        counties = get_study_counties()
+        frames = {detail: index.query(level=1, counties=counties, detail=detail) for detail in DETAIL_LEVELS}
+        if frames['full'].empty:
+            raise CommandError(f"No boundaries found for the study counties: {', '.join(counties)}")
+
+        output_dir = options['output_dir'] or get_county_geojson_dir()
+        # Not while a web worker is rebuilding them (see geo_views.get_county_geojson)
+        lock = RebuildLock('county_geojson')
+        lock.acquire()
+        try:
+            manifest = build_county_geojson(frames, counties, output_dir)
+        finally:
+            lock.release()
+        self.stdout.write(f"Counties: {', '.join(counties)}")
+        for detail, entry in manifest['details'].items():
+            self.stdout.write(f"  {detail:<6}  {entry['bytes'] / 1024:8.1f} KB  {entry['file']}")
+        if brotli is None:
+            self.stdout.write("brotli is not installed; only gzip variants were written.")
+        self.stdout.write(self.style.SUCCESS(f"Wrote county GeoJSON to {output_dir}."))
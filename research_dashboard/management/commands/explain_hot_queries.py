@@ -0,0 +1,112 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from research_dashboard.models import Evaluation, EvaluationPhase, ProjectMilestone, ResearchProject
+from research_dashboard.views import (
+    DashboardView, ProjectListApiView, _completion_percent, _count_subquery, _filter_projects,
+)
+
+# Hot queries that read every row by design, and why
+EXPECTED_SCANS = {
+    'dashboard page, by completion': 'completion is computed per project, so sorting on it reads them all',
+}
+
+
+def get_hot_queries(project_id):
+    """
+    The querysets behind the dashboard, project API, timeline and milestone
+    pages, by name, built the way the views build them.
+    """
+    today = timezone.now().date()
+    dashboard = ResearchProject.objects.annotate(
+        active_phases=_count_subquery(EvaluationPhase.objects.filter(completed=False)),
+        completed_milestones=_count_subquery(ProjectMilestone.objects.filter(status='completed')),
+        total_milestones=_count_subquery(ProjectMilestone.objects.all()),
+    ).annotate(completion_percent=_completion_percent(today))
+    newest = ResearchProject.objects.order_by('-created_at', '-id').values('created_at', 'id').first()
+    keyset = ResearchProject.objects.all()
+    if newest:
+        keyset = keyset.filter(
+            Q(created_at__lt=newest['created_at']) | Q(created_at=newest['created_at'], id__lt=newest['id'])
+        )
+
+    return {
+        'dashboard page': dashboard.order_by('-created_at')[:10],
+        'dashboard page, by status': _filter_projects(dashboard, {'status': 'active'}).order_by('-created_at')[:10],
+        'dashboard page, by completion': dashboard.order_by(
+            f"-{DashboardView.SORT_FIELDS['completion']}", '-created_at')[:10],
+        # Same scan as the aggregate of status totals, which cannot be explained directly
+        'status totals': ResearchProject.objects.order_by().values('status').annotate(count=Count('pk')),
+        'project name dropdown': ResearchProject.objects.values_list('title', flat=True).distinct().order_by('title'),
+        'project API page': keyset.order_by('-created_at', '-id').values(
+            'id', 'title', 'status', 'start_date', 'end_date', 'created_at')[:ProjectListApiView.DEFAULT_LIMIT + 1],
+        'timeline phases': EvaluationPhase.objects.filter(project_id=project_id).order_by('start_date'),
+        'timeline milestones': ProjectMilestone.objects.filter(project_id=project_id).order_by('due_date'),
+        'timeline phases, manual order': EvaluationPhase.objects.filter(project_id=project_id).order_by('order'),
+        'timeline milestones, manual order': ProjectMilestone.objects.filter(project_id=project_id).order_by('order'),
+        # The overdue sweep (ProjectMilestone.sweep_overdue)
+        'overdue milestones': ProjectMilestone.objects.filter(
+            status='pending', due_date__lt=today).values('project_id'),
+        'milestones no longer overdue': ProjectMilestone.objects.filter(
+            status='overdue', due_date__gte=today).values('project_id'),
+        'evaluation list': Evaluation.objects.order_by('-created_at')[:25],
+    }
+
+
+def explain(queryset):
+    """
+    The query plan of `queryset` as (rows, full-scan descriptions). Only
+    SQLite and MySQL plans are checked for full table scans.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            rows = [row[-1] for row in cursor.fetchall()]
+            # "SCAN table" without an index is a full scan; "SCAN table USING
+            # (COVERING) INDEX" walks an index in order.
+            scans = [row for row in rows if row.startswith('SCAN ') and 'INDEX' not in row]
+            return rows, scans
+        if connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0] for column in cursor.description]
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            rows = [
+                f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row.get('Extra') or ''}"
+                for row in plan
+            ]
+            scans = [f"{row['table']} (type=ALL)" for row in plan if row['type'] == 'ALL']
+            return rows, scans
+    return queryset.explain().splitlines(), []
+
+
+class Command(BaseCommand):
+    help = ("Prints the query plan (EXPLAIN) of each hot dashboard, project API and timeline "
+            "query on the configured database, and flags full table scans (SQLite and MySQL).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int,
+                            help='Project whose timeline queries to explain (default: the newest).')
+        parser.add_argument('--check', action='store_true', help='Exit non-zero if any query does a full scan.')
+
+    def handle(self, *args, **options):
+        project_id = options['project'] or ResearchProject.objects.values_list('pk', flat=True).first() or 0
+
+        full_scans = {}
+        for name, queryset in get_hot_queries(project_id).items():
+            rows, scans = explain(queryset)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for row in rows:
+                self.stdout.write(f"  {row}")
+            if scans and name in EXPECTED_SCANS:
+                self.stdout.write(f"  full scan (expected: {EXPECTED_SCANS[name]})")
+            elif scans:
+                full_scans[name] = scans
+                self.stdout.write(self.style.WARNING(f"  full scan: {', '.join(scans)}"))
+
+        if not full_scans:
+            self.stdout.write(self.style.SUCCESS(f"No unexpected full table scans on {connection.vendor}."))
+        elif options['check']:
+            raise CommandError(f"Full table scans in: {', '.join(full_scans)}")
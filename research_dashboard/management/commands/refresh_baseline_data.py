@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from research_dashboard.data_utils import file_content_hash, get_baseline_csv_path
+from research_dashboard.baseline_data import get_published_baseline
+from research_dashboard.baseline_views import publish_baseline_version
+from research_dashboard.chart_cache import is_cache_shared
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds the baseline snapshot, aggregates and unfiltered charts off the request "
+            "path and publishes them as a new data version. Safe to run from cron or any "
+            "scheduler; exits non-zero if the rebuild fails.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', help='REDCap export to publish (default: the configured baseline CSV).')
+        parser.add_argument('--if-changed', action='store_true',
+                            help='Do nothing if the CSV matches the currently published version.')
+        parser.add_argument('--skip-charts', action='store_true',
+                            help='Do not pre-render the unfiltered charts.')
+
+    def handle(self, *args, **options):
+        if not is_cache_shared():
+            # The version would be published into this process's memory only
+            raise CommandError(
+                f"The cache backend ({settings.CACHES['default']['BACKEND']}) is local to each process, so "
+                f"the web workers would never see the published version. Configure a shared backend "
+                f"(CACHE_BACKEND / CACHE_LOCATION) first."
+            )
+
+        csv_path = options['csv'] or get_baseline_csv_path()
+
+        if options['if_changed']:
+            published = get_published_baseline()
+            try:
+                source_hash = file_content_hash(csv_path)
+            except OSError as e:
+                raise CommandError(f"Cannot read {csv_path}: {e}")
+            if published and published['source_hash'] == source_hash:
+                self.stdout.write(f"Baseline data unchanged since {published['published_at']}; nothing to do.")
+                return
+
+        start = time.perf_counter()
+        try:
+            version = publish_baseline_version(csv_path, warm_charts=not options['skip_charts'])
+        except Exception as e:
+            raise CommandError(f"Baseline refresh failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Published baseline data version {version} in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,27 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from research_dashboard.models import ProjectMilestone
+
+
+class Command(BaseCommand):
+    help = ("Marks every pending milestone past its due date as overdue, and moves overdue "
+            "milestones that are no longer past due back to pending, in two bulk updates. "
+            "Run it daily from cron or any scheduler.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Treat this date (YYYY-MM-DD) as today (default: the current date).')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['date']}', expected YYYY-MM-DD.")
+
+        marked, reverted = ProjectMilestone.sweep_overdue(today)
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {marked} milestone(s) overdue and {reverted} back to pending."
+        ))
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research_dashboard', '0009_evaluationphase_order_projectmilestone_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['created_at'], name='rd_evaluation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluationphase',
+            index=models.Index(fields=['project', 'start_date'], name='rd_phase_project_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluationphase',
+            index=models.Index(fields=['project', 'order'], name='rd_phase_project_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluationphase',
+            index=models.Index(fields=['project', 'completed'], name='rd_phase_project_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmilestone',
+            index=models.Index(fields=['project', 'due_date'], name='rd_milestone_proj_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmilestone',
+            index=models.Index(fields=['project', 'order'], name='rd_milestone_proj_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmilestone',
+            index=models.Index(fields=['project', 'status'], name='rd_milestone_proj_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectmilestone',
+            index=models.Index(fields=['status', 'due_date'], name='rd_milestone_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='researchproject',
+            index=models.Index(fields=['status', 'created_at'], name='rd_project_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='researchproject',
+            index=models.Index(fields=['created_at', 'id'], name='rd_project_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='researchproject',
+            index=models.Index(fields=['title'], name='rd_project_title_idx'),
+        ),
+    ]
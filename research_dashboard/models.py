@@ -1,3 +1,5 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -26,6 +28,14 @@ class ResearchProject(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard list (newest first, optionally by status) and the
+            # keyset-paginated project API
+            models.Index(fields=['status', 'created_at'], name='rd_project_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='rd_project_created_id_idx'),
+            # Project name dropdown
+            models.Index(fields=['title'], name='rd_project_title_idx'),
+        ]
 
 class Evaluation(models.Model):
     PHASE_CHOICES = [
@@ -54,6 +64,9 @@ class Evaluation(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='rd_evaluation_created_idx'),
+        ]
 
 class EvaluationPhase(models.Model):
     PHASE_TYPES = [
@@ -82,6 +95,14 @@ class EvaluationPhase(models.Model):
         dates = f"({self.start_date} to {self.end_date})"
         return f"{self.project.title} - {phase} {dates}"
 
+    class Meta:
+        indexes = [
+            # A project's timeline, in date or manual order, and its active phase count
+            models.Index(fields=['project', 'start_date'], name='rd_phase_project_start_idx'),
+            models.Index(fields=['project', 'order'], name='rd_phase_project_order_idx'),
+            models.Index(fields=['project', 'completed'], name='rd_phase_project_done_idx'),
+        ]
+
 class ProjectMilestone(models.Model):
     MILESTONE_STATUS = [
         ('pending', 'Pending'),
@@ -100,6 +121,16 @@ class ProjectMilestone(models.Model):
     def __str__(self):
         return f"{self.project.title} - {self.name}"
 
+    class Meta:
+        indexes = [
+            # A project's timeline, in date or manual order, and its milestone counts
+            models.Index(fields=['project', 'due_date'], name='rd_milestone_proj_due_idx'),
+            models.Index(fields=['project', 'order'], name='rd_milestone_proj_order_idx'),
+            models.Index(fields=['project', 'status'], name='rd_milestone_proj_status_idx'),
+            # Milestones due before a date that are not yet completed or overdue
+            models.Index(fields=['status', 'due_date'], name='rd_milestone_status_due_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         from django.utils import timezone
         today = timezone.now().date()
@@ -112,15 +143,45 @@ class ProjectMilestone(models.Model):
             if self.completed_date:
                 self.completed_date = None
         
-        # Handle overdue status - only if due_date exists and is a date object
-        if self.status != 'completed' and self.due_date and hasattr(self.due_date, 'date'):
-            if self.due_date < today:
+        # Handle overdue status - only if due_date is already a date (it can
+        # still be the raw string when assigned from request data)
+        if self.status != 'completed' and isinstance(self.due_date, datetime.date):
+            due_date = self.due_date.date() if isinstance(self.due_date, datetime.datetime) else self.due_date
+            if due_date < today:
                 self.status = 'overdue'
-            elif self.status == 'overdue' and self.due_date >= today:
+            elif self.status == 'overdue':
                 self.status = 'pending'
-            
+
         super().save(*args, **kwargs)
 
+    @classmethod
+    def sweep_overdue(cls, today=None):
+        """
+        Brings every milestone's overdue status up to date in two UPDATEs:
+        pending milestones due before `today` become overdue, and overdue ones
+        no longer past due go back to pending. save() only does this for the
+        row being saved, so this is meant to run daily
+        (manage.py sweep_overdue_milestones).
+
+        Returns:
+            tuple: (milestones marked overdue, milestones reverted to pending)
+        """
+        from .timeline_cache import bump_timeline_version
+
+        today = today or timezone.localdate()
+        past_due = cls.objects.filter(status='pending', due_date__lt=today)
+        not_due = cls.objects.filter(status='overdue', due_date__gte=today)
+
+        # update() sends no post_save signals, so retire the affected
+        # projects' cached timelines here
+        project_ids = set(past_due.values_list('project_id', flat=True).distinct())
+        project_ids.update(not_due.values_list('project_id', flat=True).distinct())
+        marked = past_due.update(status='overdue')
+        reverted = not_due.update(status='pending')
+        for project_id in project_ids:
+            bump_timeline_version(project_id)
+        return marked, reverted
+
 class ProgressMetric(models.Model):
     project = models.ForeignKey(ResearchProject, on_delete=models.CASCADE, related_name='metrics')
     name = models.CharField(max_length=100)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import EvaluationPhase, ProjectMilestone
+from .timeline_cache import bump_timeline_version
+
+
+@receiver([post_save, post_delete], sender=EvaluationPhase)
+@receiver([post_save, post_delete], sender=ProjectMilestone)
+def timeline_changed(sender, instance, **kwargs):
+    """Retires the cached timeline charts of the project a phase or milestone belongs to."""
+    bump_timeline_version(instance.project_id)
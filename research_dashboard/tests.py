@@ -1,3 +1,857 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+import threading
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .baseline_cube import BaselineCube
+from .baseline_data import (
+    RebuildLock, _baseline_memo, get_baseline_cube, get_baseline_data_version, get_published_baseline,
+    memoize_baseline,
+)
+from .baseline_views import ProjectBaselineChartView
+from .boundaries import get_boundary_index, get_study_counties
+from .chart_cache import ChartCache, canonical_filters, chart_cache, get_chart, set_chart, shared_chart_key
+from .county_geojson import build_county_geojson, load_county_geojson
+from .data_utils import (
+    clean_baseline_csv_chunked, clean_baseline_dataframe, compact_baseline_dataframe, file_content_hash,
+    get_snapshot_path, load_and_clean_data, load_snapshot, release_baseline_data,
+)
+from .geo_views import get_county_geojson
+from .management.commands import explain_hot_queries
+from .management.commands.benchmark_baseline_cleaning import reference_clean, synthetic_export
+from .models import EvaluationPhase, ProjectMilestone, ResearchProject
+from .timeline_cache import get_timeline_version
+from .views import ProjectTimelineView
+
+# Tests use a private in-memory cache instead of the shared one in settings
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class SyntheticBaselineMixin:
+    """Serves the baseline pages from a synthetic export in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.csv_path = os.path.join(tmp.name, 'export.csv')
+        synthetic_export(facilities=60, months=12).to_csv(self.csv_path, index=False)
+
+        settings_override = override_settings(
+            BASELINE_CSV_PATH=self.csv_path, BASELINE_SNAPSHOT_DIR=os.path.join(tmp.name, 'snapshots'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for cleanup in (release_baseline_data, _baseline_memo.clear, cache.clear, chart_cache.clear):
+            cleanup()
+            self.addCleanup(cleanup)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BaselineCubeTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 120
+        visits = rng.integers(0, 100, n).astype(float)
+        visits[rng.random(n) < 0.2] = np.nan
+        expenditure = rng.integers(1000, 5000, n).astype(float)
+        expenditure[rng.random(n) < 0.1] = 0
+        self.df = pd.DataFrame({
+            'facility_mfl': np.arange(n),
+            'county': pd.Categorical(rng.choice(['Kiambu', 'Kitui', 'Nairobi'], n)),
+            'level': pd.Categorical(rng.choice(['Level 2', 'Level 3', 'Level 4'], n)),
+            'ownership': pd.Categorical(rng.choice(['FBO', 'MOH', 'Private'], n)),
+            'employed_nurse': rng.integers(0, 20, n),
+            'hiv_jan': visits,
+            'his_hiv': pd.Categorical(rng.choice(['EMR Based', 'Paper Based', None], n)),
+            'total_expenditure_year': expenditure,
+        })
+        self.cube = BaselineCube(self.df)
+        self.filters = {'county': ['Kiambu', 'Nairobi'], 'level': ['Level 2', 'Level 3', 'Level 4'], 'ownership': ['MOH', 'Private']}
+
+    def filtered(self, filters):
+        mask = np.ones(len(self.df), dtype=bool)
+        for dimension, values in filters.items():
+            mask &= self.df[dimension].isin(values).to_numpy()
+        return self.df[mask]
+
+    def test_selection_matches_pandas_on_the_filtered_frame(self):
+        selection = self.cube.select(**self.filters)
+        df = self.filtered(self.filters)
+        columns = ['employed_nurse', 'hiv_jan']
+
+        self.assertEqual(selection.facility_count, len(df))
+        pd.testing.assert_series_equal(selection.count_by('level'), df.groupby('level', observed=True).size())
+        pd.testing.assert_series_equal(selection.sum(columns), df[columns].sum())
+        pd.testing.assert_series_equal(selection.mean(columns), df[columns].mean())
+        pd.testing.assert_frame_equal(
+            selection.sum_by('county', columns), df.groupby('county', observed=True)[columns].sum())
+        pd.testing.assert_frame_equal(
+            selection.mean_by('county', columns), df.groupby('county', observed=True)[columns].mean())
+        pd.testing.assert_series_equal(
+            selection.value_counts('his_hiv'), df['his_hiv'].value_counts()[lambda counts: counts > 0],
+            check_categorical=False, check_index_type=False)
+        pd.testing.assert_series_equal(
+            selection.value_counts('ownership'), df['ownership'].value_counts()[lambda counts: counts > 0],
+            check_categorical=False, check_index_type=False)
+        pd.testing.assert_series_equal(
+            selection.size_by('county', 'his_hiv'), df.groupby(['county', 'his_hiv'], observed=True).size(),
+            check_categorical=False, check_index_type=False)
+        pd.testing.assert_frame_equal(
+            selection.median_by('level', ['total_expenditure_year'], ignore_values=[0]),
+            df[['total_expenditure_year']].replace(0, np.nan).groupby(df['level'], observed=True).median(),
+        )
+
+    def test_empty_selection(self):
+        selection = self.cube.select(['Mombasa'], ['Level 2'], ['MOH'])
+
+        self.assertTrue(selection.empty)
+        self.assertEqual(selection.facility_count, 0)
+        self.assertTrue(selection.count_by('level').empty)
+        self.assertTrue(selection.value_counts('his_hiv').empty)
+        self.assertTrue((selection.sum(['employed_nurse', 'hiv_jan']) == 0).all())
+        self.assertTrue(selection.mean(['employed_nurse', 'hiv_jan']).isna().all())
+
+    def test_distinct_respects_filters(self):
+        self.assertEqual(self.cube.distinct('county'), ['Kiambu', 'Kitui', 'Nairobi'])
+        expected = sorted(self.df.loc[self.df['county'] == 'Kitui', 'level'].unique().tolist())
+        self.assertEqual(self.cube.distinct('level', county=['Kitui']), expected)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ChartCacheTests(SimpleTestCase):
+    def setUp(self):
+        chart_cache.clear()
+        self.addCleanup(chart_cache.clear)
+
+    def test_lru_evicts_by_bytes(self):
+        charts = ChartCache(max_bytes=10)
+        charts.set('a', 'aaaa')
+        charts.set('b', 'bbbb')
+        charts.get('a')
+        charts.set('c', 'cccc')
+
+        self.assertIsNone(charts.get('b'))
+        self.assertEqual((charts.get('a'), charts.get('c')), ('aaaa', 'cccc'))
+        charts.set('d', 'd' * 11)
+        self.assertIsNone(charts.get('d'))
+        self.assertEqual(len(charts), 2)
+
+    def test_canonical_filters_ignore_order_duplicates_and_blanks(self):
+        factory = RequestFactory()
+        key = canonical_filters(factory.get('/', {'county': ['Kitui', 'Nairobi', 'Kitui'], 'level': ''}))
+
+        self.assertEqual(key, canonical_filters(factory.get('/', {'county': ['Nairobi', 'Kitui']})))
+        self.assertEqual(key, (('county', ('Kitui', 'Nairobi')), ('level', ()), ('ownership', ())))
+
+    def test_local_cache_backend_is_not_used_as_a_second_tier(self):
+        set_chart(('v1', 'tab', ()), '{}')
+
+        self.assertIsNone(cache.get(shared_chart_key(('v1', 'tab', ()))))
+        self.assertEqual(get_chart(('v1', 'tab', ())), '{}')
+
+    def test_shared_tier_is_bounded_per_data_version(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tmp}},
+            BASELINE_CHART_SHARED_MAX_ENTRIES=2,
+        ):
+            for tab in ('a', 'b', 'c'):
+                set_chart(('v1', tab, ()), tab)
+            set_chart(('v2', 'a', ()), 'a')
+
+            self.assertEqual(
+                [cache.get(shared_chart_key(key)) for key in [('v1', 'a', ()), ('v1', 'b', ()), ('v1', 'c', ()), ('v2', 'a', ())]],
+                ['a', 'b', None, 'a'],
+            )
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class RefreshBaselineDataTests(SimpleTestCase):
+    def test_refuses_to_publish_into_a_process_local_cache(self):
+        with self.assertRaisesMessage(CommandError, 'local to each process'):
+            call_command('refresh_baseline_data')
+
+
+class CountyGeojsonDirMixin:
+    """Builds the county GeoJSON artifacts into a temporary directory."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.geojson_dir = tempfile.mkdtemp()
+        cls.geojson_override = override_settings(COUNTY_GEOJSON_DIR=cls.geojson_dir)
+        cls.geojson_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.geojson_override.disable()
+        shutil.rmtree(cls.geojson_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, params=None, **headers):
+        return self.client.get(reverse('api_county_boundaries'), params or {}, **headers)
+
+
+@override_settings(CACHES=LOCAL_CACHES, STUDY_COUNTIES=['Kiambu', 'Nairobi'])
+class CountyGeojsonTests(CountyGeojsonDirMixin, SimpleTestCase):
+    def test_etag_revalidation_returns_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {feature['properties']['name'] for feature in response.json()['features']}, {'Kiambu', 'Nairobi'}
+        )
+
+        revalidated = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_gzip_variant_is_negotiated(self):
+        identity = self.get()
+        compressed = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertNotEqual(compressed['ETag'], identity['ETag'])
+        self.assertEqual(gzip.decompress(compressed.content), identity.content)
+
+    def test_zoom_picks_a_detail_level(self):
+        self.assertEqual(self.get({'zoom': 5})['ETag'], self.get({'detail': 'low'})['ETag'])
+        self.assertEqual(self.get({'zoom': 14})['ETag'], self.get({'detail': 'full'})['ETag'])
+        self.assertEqual(self.get({'detail': 'ultra'}).status_code, 400)
+
+    def test_rebuild_replaces_the_artifacts_atomically(self):
+        self.assertEqual(get_county_geojson('low')['counties'], ['Kiambu', 'Nairobi'])
+
+        frame = get_boundary_index().query(level=1, counties=['Nairobi'], detail='low')
+        build_county_geojson({'low': frame}, ['Nairobi'])
+
+        self.assertFalse([name for name in os.listdir(self.geojson_dir) if name.startswith('.tmp-')])
+        artifact = load_county_geojson('low')
+        self.assertEqual(artifact['counties'], ['Nairobi'])
+        self.assertEqual(gzip.decompress(artifact['gzip']), artifact['identity'])
+        # Built for other counties than the study's, so rebuilt on the next request
+        self.assertEqual(get_county_geojson('low')['counties'], ['Kiambu', 'Nairobi'])
+
+
+@override_settings(CACHES=LOCAL_CACHES, STUDY_COUNTIES=['Kiambu', 'Nairobi'])
+class CountyBoundariesApiTests(CountyGeojsonDirMixin, SimpleTestCase):
+    def test_bbox_selects_intersecting_features(self):
+        # Around Nairobi's CBD only
+        response = self.get({'bbox': '36.80,-1.30,36.85,-1.27'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([feature['properties']['name'] for feature in response.json()['features']], ['Nairobi'])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in [{'bbox': '1,2,3'}, {'bbox': '3,2,1,4'}, {'bbox': 'a,b,c,d'}, {'level': '5'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.get(params).status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHES, STUDY_COUNTIES=None)
+class StudyCountiesTests(SyntheticBaselineMixin, SimpleTestCase):
+    def test_waits_for_the_current_version_while_another_worker_rebuilds(self):
+        _baseline_memo['study_counties'] = ('previous-version', ['Mombasa'])
+        lock = RebuildLock('study_counties')
+        self.assertTrue(lock.acquire())
+        results = []
+        thread = threading.Thread(target=lambda: results.append(get_study_counties()))
+        thread.start()
+        try:
+            thread.join(0.2)
+            # Not answered with the previous version's counties
+            self.assertEqual(results, [])
+        finally:
+            lock.release()
+        thread.join()
+
+        self.assertEqual(results, [['Kiambu', 'Kitui', 'Nairobi']])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ImportTimeTests(SimpleTestCase):
+    def test_urlconf_does_not_import_analytics_packages(self):
+        stdout = StringIO()
+        call_command('benchmark_import_time', stdout=stdout)
+        self.assertIn('No analytics packages are imported at startup.', stdout.getvalue())
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ReadinessCheckTests(SimpleTestCase):
+    @mock.patch('research_dashboard.views.start_warm_up')
+    @mock.patch('research_dashboard.views.get_warm_up_state', return_value={
+        'status': 'failed', 'tasks': {'baseline': 'failed', 'geodata': 'ok'},
+    })
+    def test_reports_only_task_flags(self, get_warm_up_state, start_warm_up):
+        response = self.client.get(reverse('readiness_check'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {
+            'status': 'pending', 'tasks': {'baseline': 'pending', 'geodata': 'ready', 'charts': 'pending'},
+        })
+        start_warm_up.assert_called_once()
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class MemoizeBaselineTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(BASELINE_SNAPSHOT_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.addCleanup(_baseline_memo.pop, 'test_object', None)
+
+    def test_concurrent_builders_build_once(self):
+        calls = []
+
+        def build():
+            calls.append(threading.get_ident())
+            time.sleep(0.2)
+            return 'built'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(memoize_baseline('test_object', build, stale=False)))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['built', 'built'])
+
+    def test_serves_the_previous_version_while_another_worker_rebuilds(self):
+        _baseline_memo['test_object'] = ('previous-version', 'previous')
+        lock = RebuildLock('test_object')
+        self.assertTrue(lock.acquire())
+        try:
+            self.assertEqual(memoize_baseline('test_object', lambda: 'built'), 'previous')
+        finally:
+            lock.release()
+
+        self.assertEqual(memoize_baseline('test_object', lambda: 'built'), 'built')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BaselineSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv_path = os.path.join(self.tmp.name, 'export.csv')
+        synthetic_export(facilities=50, months=12).to_csv(self.csv_path, index=False)
+
+        settings_override = override_settings(BASELINE_SNAPSHOT_DIR=os.path.join(self.tmp.name, 'snapshots'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        release_baseline_data()
+        self.addCleanup(release_baseline_data)
+
+    def test_snapshot_round_trip(self):
+        df = load_and_clean_data(self.csv_path)
+
+        snapshot_path = get_snapshot_path(file_content_hash(self.csv_path))
+        self.assertTrue(os.path.exists(os.path.join(snapshot_path, 'meta.json')))
+        expected = clean_baseline_dataframe(pd.read_csv(self.csv_path))
+        pd.testing.assert_frame_equal(df, expected)
+        pd.testing.assert_frame_equal(load_snapshot(snapshot_path), expected)
+
+    def test_changed_csv_rebuilds_the_snapshot(self):
+        load_and_clean_data(self.csv_path)
+        old_snapshot = get_snapshot_path(file_content_hash(self.csv_path))
+
+        synthetic_export(facilities=60, months=12, seed=1).to_csv(self.csv_path, index=False)
+        df = load_and_clean_data(self.csv_path)
+
+        self.assertEqual(len(df), 60)
+        new_snapshot = get_snapshot_path(file_content_hash(self.csv_path))
+        self.assertNotEqual(new_snapshot, old_snapshot)
+        self.assertTrue(os.path.isdir(new_snapshot))
+        # The previous snapshot of the table is pruned
+        self.assertFalse(os.path.exists(old_snapshot))
+
+    def test_unreadable_snapshot_falls_back_to_the_csv(self):
+        load_and_clean_data(self.csv_path)
+        snapshot_path = get_snapshot_path(file_content_hash(self.csv_path))
+        with open(os.path.join(snapshot_path, 'meta.json'), 'w') as f:
+            f.write('{"format": 0}')
+        self.assertIsNone(load_snapshot(snapshot_path))
+
+        release_baseline_data()
+        pd.testing.assert_frame_equal(
+            load_and_clean_data(self.csv_path), clean_baseline_dataframe(pd.read_csv(self.csv_path))
+        )
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BaselineCleaningTests(SimpleTestCase):
+    def setUp(self):
+        self.raw = synthetic_export(facilities=300, months=12)
+
+    def test_matches_reference_cleaning(self):
+        expected = compact_baseline_dataframe(reference_clean(self.raw.copy()))
+
+        pd.testing.assert_frame_equal(clean_baseline_dataframe(self.raw.copy()), expected)
+
+    def test_chunked_cleaning_matches_whole_file_cleaning(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'export.csv')
+            self.raw.to_csv(path, index=False)
+
+            pd.testing.assert_frame_equal(
+                clean_baseline_csv_chunked(path, chunksize=70), clean_baseline_dataframe(pd.read_csv(path))
+            )
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class DashboardViewTests(TestCase):
+    # Session, user, status totals, the paginator's count, the page of
+    # projects and the title dropdown
+    DASHBOARD_QUERIES = 6
+
+    def setUp(self):
+        self.user = User.objects.create_user('researcher', password='password')
+        self.client.force_login(self.user)
+
+    def create_project(self, title, status='active', phases=(), milestones=(),
+                       start_date=date(2024, 1, 1), end_date=date(2025, 1, 1)):
+        project = ResearchProject.objects.create(
+            title=title, description='', start_date=start_date, end_date=end_date,
+            status=status, lead_researcher=self.user,
+        )
+        for completed in phases:
+            EvaluationPhase.objects.create(
+                project=project, phase_type='baseline', start_date=date(2024, 1, 1),
+                end_date=date(2024, 2, 1), completed=completed,
+            )
+        for status in milestones:
+            ProjectMilestone.objects.create(project=project, name='Milestone', due_date=date(2030, 1, 1), status=status)
+        return project
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.create_project('First', phases=[False], milestones=['completed'])
+        with self.assertNumQueries(self.DASHBOARD_QUERIES):
+            self.client.get(reverse('dashboard'))
+
+        for i in range(15):
+            self.create_project(f'Project {i}', status='planned', phases=[False, True], milestones=['pending', 'completed'])
+        with self.assertNumQueries(self.DASHBOARD_QUERIES):
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.context['total_projects_count'], 16)
+        self.assertEqual(response.context['status_counts']['planned'], 15)
+        self.assertEqual(response.context['status_counts']['active'], 1)
+        self.assertEqual(response.context['status_counts']['completed'], 0)
+
+    def test_phase_and_milestone_counts_are_not_multiplied(self):
+        self.create_project('Counted', phases=[False, False, True], milestones=['completed', 'pending', 'completed', 'pending'])
+
+        response = self.client.get(reverse('dashboard'))
+
+        project = response.context['page_obj'][0]
+        self.assertEqual(project.active_phases, 2)
+        self.assertEqual(project.completed_milestones, 2)
+        self.assertEqual(project.total_milestones, 4)
+
+    def test_completion_is_sortable_and_filterable(self):
+        today = timezone.now().date()
+        self.create_project('Done', start_date=today - timedelta(days=20), end_date=today - timedelta(days=10))
+        self.create_project('Halfway', start_date=today - timedelta(days=10), end_date=today + timedelta(days=10))
+        self.create_project('Upcoming', start_date=today + timedelta(days=10), end_date=today + timedelta(days=20))
+        self.create_project('Milestones', end_date=None, milestones=['completed', 'pending', 'pending', 'pending'])
+
+        response = self.client.get(reverse('dashboard'), {'sort': 'completion', 'order': 'desc'})
+        self.assertEqual(
+            [(project.title, project.completion_percent) for project in response.context['page_obj']],
+            [('Done', 100), ('Halfway', 50), ('Milestones', 25), ('Upcoming', 0)],
+        )
+
+        response = self.client.get(reverse('dashboard'), {'completion_min': 25, 'completion_max': 99})
+        self.assertEqual({project.title for project in response.context['page_obj']}, {'Halfway', 'Milestones'})
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ProjectListApiTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('researcher', password='password'))
+        created_at = timezone.now()
+        # Pairs of projects share a created_at, so paging has to break ties on id
+        for i in range(12):
+            ResearchProject.objects.create(
+                title=f'Project {i}', description='', start_date=date(2024, 1, 1),
+                status='active' if i % 3 else 'planned', created_at=created_at - timedelta(minutes=i // 2),
+            )
+
+    def get_all_pages(self, params):
+        projects, cursor, pages = [], None, 0
+        while True:
+            # Session, user and one query for the page
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('api_project_list'), dict(params, **({'cursor': cursor} if cursor else {})))
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            projects += data['results']
+            pages += 1
+            cursor = data['next_cursor']
+            if cursor is None:
+                return projects, pages
+
+    def test_keyset_pages_cover_every_project_once(self):
+        projects, pages = self.get_all_pages({'limit': 5, 'fields': 'id,title'})
+
+        expected = list(ResearchProject.objects.order_by('-created_at', '-id').values('id', 'title'))
+        self.assertEqual(projects, expected)
+        self.assertEqual(pages, 3)
+
+    def test_filters_and_field_selection(self):
+        projects, _ = self.get_all_pages({'status': 'planned', 'fields': 'title,status,completion_percent'})
+
+        self.assertEqual(len(projects), 4)
+        self.assertTrue(all(set(project) == {'title', 'status', 'completion_percent'} for project in projects))
+        self.assertTrue(all(project['status'] == 'planned' for project in projects))
+
+    def test_rejects_unknown_fields_and_bad_cursors(self):
+        self.assertEqual(self.client.get(reverse('api_project_list'), {'fields': 'title,password'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_project_list'), {'cursor': 'not-a-cursor'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ExplainHotQueriesTests(TestCase):
+    def setUp(self):
+        project = ResearchProject.objects.create(
+            title='Project', description='', start_date=date(2024, 1, 1), status='active',
+        )
+        ProjectMilestone.objects.create(project=project, name='Kickoff', due_date=date(2024, 1, 15))
+
+    def test_hot_queries_use_indexes(self):
+        stdout = StringIO()
+        call_command('explain_hot_queries', '--check', stdout=stdout)
+        self.assertIn('No unexpected full table scans', stdout.getvalue())
+
+    def test_check_fails_on_a_full_scan(self):
+        queries = {'milestones by name': ProjectMilestone.objects.filter(name='Kickoff')}
+        with mock.patch.object(explain_hot_queries, 'get_hot_queries', return_value=queries):
+            with self.assertRaisesMessage(CommandError, 'milestones by name'):
+                call_command('explain_hot_queries', '--check', stdout=StringIO())
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class MilestoneOverdueTests(TestCase):
+    def setUp(self):
+        self.project = ResearchProject.objects.create(
+            title='Project', description='', start_date=date(2024, 1, 1), status='active',
+        )
+
+    def test_save_marks_past_due_milestones_overdue(self):
+        milestone = ProjectMilestone.objects.create(project=self.project, name='Late', due_date=date(2020, 1, 1))
+        self.assertEqual(milestone.status, 'overdue')
+
+        milestone.due_date = timezone.localdate() + timedelta(days=1)
+        milestone.save()
+        self.assertEqual(milestone.status, 'pending')
+
+    def test_sweep_updates_statuses_in_bulk(self):
+        today = date(2025, 6, 1)
+        milestones = {
+            (name, due_date, status): ProjectMilestone.objects.create(project=self.project, name=name, due_date=date(2030, 1, 1))
+            for name, due_date, status in [
+                ('past due', date(2025, 5, 31), 'pending'),
+                ('due today', today, 'overdue'),
+                ('completed', date(2025, 1, 1), 'completed'),
+                ('still overdue', date(2025, 1, 1), 'overdue'),
+            ]
+        }
+        # Set the statuses as of `today` without going through save()
+        for (_, due_date, status), milestone in milestones.items():
+            ProjectMilestone.objects.filter(pk=milestone.pk).update(due_date=due_date, status=status)
+
+        # Two SELECTs of the affected projects, then the two UPDATEs
+        with self.assertNumQueries(4):
+            self.assertEqual(ProjectMilestone.sweep_overdue(today), (1, 1))
+
+        self.assertEqual(
+            dict(ProjectMilestone.objects.values_list('name', 'status')),
+            {'past due': 'overdue', 'due today': 'pending', 'completed': 'completed', 'still overdue': 'overdue'},
+        )
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ProjectTimelineTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('researcher', password='password'))
+        self.project = ResearchProject.objects.create(
+            title='Project', description='', start_date=date(2024, 1, 1), status='active',
+        )
+        self.phase = EvaluationPhase.objects.create(
+            project=self.project, phase_type='baseline', start_date=date(2024, 1, 1), end_date=date(2024, 3, 1),
+        )
+        self.milestone = ProjectMilestone.objects.create(project=self.project, name='Kickoff', due_date=date(2024, 1, 15))
+
+    def get_gantt_chart(self):
+        response = self.client.get(reverse('project_timeline', args=[self.project.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.context['gantt_chart']
+
+    def render_gantt_figure(self):
+        """The figure the project's Gantt chart is drawn from."""
+        with mock.patch('plotly.offline.plot', return_value='') as plot:
+            ProjectTimelineView()._render_gantt_chart(self.project)
+        return plot.call_args.args[0]
+
+    def test_gantt_chart_draws_one_trace_per_task_type(self):
+        for i in range(3):
+            EvaluationPhase.objects.create(
+                project=self.project, phase_type='endline', start_date=date(2024, 4 + i, 1), end_date=date(2024, 5 + i, 1),
+            )
+            ProjectMilestone.objects.create(project=self.project, name=f'Milestone {i}', due_date=date(2024, 4 + i, 15))
+
+        fig = self.render_gantt_figure()
+
+        self.assertEqual([trace.type for trace in fig.data], ['bar', 'scatter'])
+        self.assertEqual(len(fig.data[0].y), 4)
+        self.assertEqual(list(fig.data[1].y), ['★ Kickoff', '★ Milestone 0', '★ Milestone 1', '★ Milestone 2'])
+        # The today marker and label, plus the colour legend
+        self.assertEqual((len(fig.layout.shapes), len(fig.layout.annotations)), (1, 2))
+
+    def test_gantt_chart_today_follows_the_active_time_zone(self):
+        # Noon UTC on June 1st is already June 2nd in Kiribati, but still June 1st in American Samoa
+        self.phase.end_date = date(2025, 6, 2)
+        self.phase.save()
+        with mock.patch('django.utils.timezone.now', return_value=datetime.fromisoformat('2025-06-01T12:00:00+00:00')):
+            with timezone.override('Pacific/Kiritimati'):
+                ahead = self.render_gantt_figure()
+            with timezone.override('Pacific/Pago_Pago'):
+                behind = self.render_gantt_figure()
+
+        self.assertEqual(ahead.layout.shapes[0].x0, datetime(2025, 6, 2, 2))
+        self.assertEqual(behind.layout.shapes[0].x0, datetime(2025, 6, 1, 1))
+        self.assertEqual(ahead.data[0].marker.color[0], ProjectTimelineView.GANTT_COLORS['overdue'])
+        self.assertEqual(behind.data[0].marker.color[0], ProjectTimelineView.GANTT_COLORS['in_progress'])
+
+    def test_saving_a_milestone_redraws_the_cached_chart(self):
+        chart = self.get_gantt_chart()
+        self.assertIn('Kickoff', chart)
+        # Served from the cache while the timeline is unchanged
+        self.assertEqual(self.get_gantt_chart(), chart)
+
+        response = self.client.post(reverse('project_timeline', args=[self.project.pk]), {
+            'add_milestone': '1', 'name': 'Data lock', 'due_date': '2024-02-20', 'description': '',
+        })
+        self.assertRedirects(response, reverse('project_timeline', args=[self.project.pk]))
+
+        updated = self.get_gantt_chart()
+        self.assertNotEqual(updated, chart)
+        self.assertIn('Data lock', updated)
+
+    def reorder(self, items, project=None):
+        return self.client.post(
+            reverse('project_timeline_order', args=[(project or self.project).pk]),
+            json.dumps({'items': items}), content_type='application/json',
+        )
+
+    def test_reorder_updates_in_constant_queries_and_bumps_the_version(self):
+        phases = [self.phase] + [
+            EvaluationPhase.objects.create(
+                project=self.project, phase_type='endline', start_date=date(2024, 6, 1), end_date=date(2024, 7, 1),
+            ) for _ in range(4)
+        ]
+        milestones = [self.milestone] + [
+            ProjectMilestone.objects.create(project=self.project, name=f'Milestone {i}', due_date=date(2024, 2, 1))
+            for i in range(4)
+        ]
+        items = [{'type': 'phase', 'id': phase.pk, 'order': i} for i, phase in enumerate(reversed(phases))]
+        items += [{'type': 'milestone', 'id': milestone.pk, 'order': i} for i, milestone in enumerate(reversed(milestones))]
+        version = get_timeline_version(self.project.pk)
+
+        # Session, user, project, the savepoint around the transaction, and one
+        # SELECT ... FOR UPDATE and one UPDATE per model
+        with self.assertNumQueries(9):
+            response = self.reorder(items)
+
+        self.assertEqual(response.json(), {'success': True, 'updated': 10})
+        self.assertEqual(list(self.project.phases.order_by('order').values_list('pk', flat=True)), [p.pk for p in reversed(phases)])
+        self.assertEqual(list(self.project.milestones.order_by('order').values_list('pk', flat=True)), [m.pk for m in reversed(milestones)])
+        self.assertNotEqual(get_timeline_version(self.project.pk), version)
+
+    def test_reorder_rejects_items_of_another_project(self):
+        other = ResearchProject.objects.create(title='Other', description='', start_date=date(2024, 1, 1), status='active')
+        foreign = ProjectMilestone.objects.create(project=other, name='Foreign', due_date=date(2024, 1, 1))
+        version = get_timeline_version(self.project.pk)
+
+        response = self.reorder([
+            {'type': 'milestone', 'id': self.milestone.pk, 'order': 1},
+            {'type': 'milestone', 'id': foreign.pk, 'order': 0},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProjectMilestone.objects.get(pk=self.milestone.pk).order, 0)
+        self.assertEqual(get_timeline_version(self.project.pk), version)
+        self.assertEqual(self.reorder([{'type': 'phase', 'id': 0, 'order': 0}]).status_code, 404)
+        self.assertEqual(self.reorder([{'type': 'phase', 'id': self.phase.pk, 'order': -1}]).status_code, 400)
+
+    def test_reorder_rejects_unknown_item_types(self):
+        for item_type in ['Phase', 'milestones', None]:
+            with self.subTest(item_type=item_type):
+                response = self.reorder([{'type': item_type, 'id': self.milestone.pk, 'order': 3}])
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProjectMilestone.objects.get(pk=self.milestone.pk).order, 0)
+
+
+def plotly_values(values):
+    """The values of a Plotly spec array, which may be encoded as a typed array."""
+    if isinstance(values, dict):
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype']).tolist()
+    return list(values)
+
+
+class BaselineApiTestCase(SyntheticBaselineMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('researcher', password='password'))
+        self.project = ResearchProject.objects.create(
+            title='Project', description='', start_date=date(2024, 1, 1), status='active',
+        )
+
+    def county_counts(self, **filters):
+        """Facilities per county in the cube cells matching `filters`."""
+        cube = get_baseline_cube()
+        counties = filters.get('county', cube.distinct('county'))
+        selection = cube.select(
+            counties, filters.get('level', cube.distinct('level', county=counties)),
+            filters.get('ownership', cube.distinct('ownership', county=counties)),
+        )
+        return selection.count_by('county').to_dict()
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BaselineChartsApiTests(BaselineApiTestCase):
+    def get_tab(self, tab, params=None):
+        return self.client.get(reverse('api_baseline_charts', args=[self.project.pk, tab]), params or {})
+
+    def test_tab_specs_match_the_cube(self):
+        response = self.get_tab('facility_profile', {'level': 'Level 3'})
+
+        self.assertEqual(response.status_code, 200)
+        specs = response.json()
+        self.assertEqual(set(specs['charts']), {'chart_county', 'chart_level', 'chart_ownership'})
+        self.assertIn('layout', specs)
+        # One bar trace per county
+        bars = {
+            trace['x'][0]: plotly_values(trace['y'])[0] for trace in specs['charts']['chart_county']['data']
+        }
+        self.assertEqual(bars, self.county_counts(level=['Level 3']))
+
+    def test_unknown_tab_is_rejected(self):
+        self.assertEqual(self.get_tab('no_such_tab').status_code, 404)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BaselineChartApiTests(BaselineApiTestCase):
+    def get_chart(self, chart, params=None):
+        return self.client.get(reverse('api_baseline_chart', args=[self.project.pk, chart]), params or {})
+
+    def test_chart_fragment_spec_matches_the_cube(self):
+        response = self.get_chart('chart_county', {'county': ['Nairobi', 'Kitui']})
+
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        self.assertIn('baseline-chart-plot', html)
+        spec = json.loads(html[html.index('>', html.index('<script')) + 1:html.index('</script>')])
+        bars = {trace['x'][0]: plotly_values(trace['y'])[0] for trace in spec['data']}
+        self.assertEqual(bars, self.county_counts(county=['Kitui', 'Nairobi']))
+        # The same selection in another order is served from the chart cache
+        with mock.patch.object(ProjectBaselineChartView, 'render_chart') as render_chart:
+            cached = self.get_chart('chart_county', {'county': ['Kitui', 'Nairobi']})
+        render_chart.assert_not_called()
+        self.assertEqual(cached.content, response.content)
+
+    def test_unknown_chart_is_rejected(self):
+        self.assertEqual(self.get_chart('chart_no_such_chart').status_code, 404)
+
+
+@override_settings(CACHES=LOCAL_CACHES, STUDY_COUNTIES=['Kiambu', 'Kitui', 'Nairobi'])
+class BaselineChoroplethApiTests(CountyGeojsonDirMixin, BaselineApiTestCase):
+    def get_choropleth(self, metric, params=None):
+        return self.client.get(reverse('api_baseline_choropleth', args=[self.project.pk, metric]), params or {})
+
+    def county_values(self, response):
+        return {feature['properties']['name']: feature['properties']['value'] for feature in response.json()['features']}
+
+    def test_values_match_the_cube(self):
+        response = self.get_choropleth('staff_total', {'detail': 'low'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        staff = get_baseline_cube().sums[ProjectBaselineChartView.KEY_STAFF_COLUMNS]
+        totals = staff.groupby(level='county', observed=True).sum().sum(axis=1)
+        expected = {county: round(float(total), 2) for county, total in totals.items()}
+        self.assertEqual(self.county_values(response), expected)
+        self.assertEqual(response.json()['metric'], {
+            'name': 'staff_total', 'label': 'Total Staff', 'min': min(expected.values()), 'max': max(expected.values()),
+        })
+
+    def test_counties_outside_the_filter_have_no_value(self):
+        response = self.get_choropleth('facility_count', {'county': 'Nairobi'})
+
+        nairobi = self.county_counts(county=['Nairobi'])['Nairobi']
+        self.assertEqual(self.county_values(response), {'Kiambu': None, 'Kitui': None, 'Nairobi': nairobi})
+        self.assertEqual((response.json()['metric']['min'], response.json()['metric']['max']), (nairobi, nairobi))
+
+    def test_unknown_metric_or_detail_is_rejected(self):
+        self.assertEqual(self.get_choropleth('no_such_metric').status_code, 404)
+        self.assertEqual(self.get_choropleth('facility_count', {'detail': 'ultra'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class InvalidateBaselineCacheTests(SyntheticBaselineMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    @mock.patch('research_dashboard.baseline_views.warm_baseline_charts')
+    def test_publishes_the_new_version_before_switching_to_it(self, warm_baseline_charts):
+        version = get_baseline_data_version()
+
+        response = self.client.post(reverse('invalidate_baseline_cache'))
+
+        self.assertEqual(response.status_code, 200)
+        new_version = response.json()['version']
+        self.assertEqual(get_baseline_data_version(), new_version)
+        self.assertNotEqual(new_version, version)
+        self.assertIsNotNone(get_published_baseline(new_version))
+        # The next request maps the published snapshot and takes the cube from the cache
+        _baseline_memo.clear()
+        with mock.patch('research_dashboard.baseline_data.load_and_clean_data') as load_and_clean_data, \
+                mock.patch('research_dashboard.baseline_data.BaselineCube') as baseline_cube:
+            self.assertEqual(get_baseline_cube().facilities.sum(), 60)
+            load_and_clean_data.assert_not_called()
+            baseline_cube.assert_not_called()
+
+    def test_failed_rebuild_keeps_the_current_version(self):
+        version = get_baseline_data_version()
+        os.remove(self.csv_path)
+
+        with self.assertLogs('research_dashboard.baseline_views', 'ERROR'):
+            response = self.client.post(reverse('invalidate_baseline_cache'))
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(get_baseline_data_version(), version)
@@ -0,0 +1,44 @@
+import uuid
+
+from django.core.cache import cache
+from django.utils import timezone
+
+# Rendered Gantt charts are keyed by the date as well (the "today" marker
+# and overdue colours change daily), so a day is as long as one can live.
+GANTT_CACHE_TIMEOUT = 86400
+
+
+def _version_key(project_id):
+    return f'project_timeline_version:{project_id}'
+
+
+def get_timeline_version(project_id):
+    """
+    Token identifying the current state of a project's phases and milestones.
+    A new token is issued by bump_timeline_version whenever one of them
+    changes, which retires the charts rendered from the previous state.
+    """
+    key = _version_key(project_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_timeline_version(project_id):
+    """Issues a new timeline version for a project (see research_dashboard.signals)."""
+    cache.set(_version_key(project_id), uuid.uuid4().hex, None)
+
+
+def get_gantt_chart(project_id, build):
+    """
+    Returns the project's rendered Gantt chart for its current timeline
+    version, calling `build()` to render it only when none is cached.
+    """
+    key = f'project_gantt:{project_id}:{get_timeline_version(project_id)}:{timezone.localdate().isoformat()}'
+    chart = cache.get(key)
+    if chart is None:
+        chart = build()
+        cache.set(key, chart, GANTT_CACHE_TIMEOUT)
+    return chart
@@ -1,23 +1,26 @@
 from django.urls import path
-from .views import DashboardView, ProjectOverviewView, ProjectTimelineView
+from .views import DashboardView, ProjectListApiView, ProjectOverviewView, ProjectTimelineView
 from .views import AboutView, LandingPageView, EvaluatorListView, EvaluatorUpdateView
 from .views import EvaluatorDeleteView, EvaluationView, EvaluationDetailView, EvaluationUpdateView
 from .views import update_phase_status, update_milestone_status, update_timeline_order
 from .views import ProjectServiceDeliveryView, ProjectHealthProductsTechnologiesView, ProjectHumanResourceForHealthView
 from .views import ProjectHealthInfoSystemsView, ProjectHealthFinancingView, ProjectDataQualityView
-from .views import ProjectLeadershipGovernanceView, ProjectBaselineView, county_boundaries_api, invalidate_baseline_cache
+from .views import ProjectLeadershipGovernanceView, readiness_check
+from .lazy import lazy_view
 from django.contrib.auth.views import LogoutView
 
 urlpatterns = [
     path('logout/', LogoutView.as_view(), name='logout'),
     path('', LandingPageView.as_view(), name='landing_page'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('api/projects/', ProjectListApiView.as_view(), name='api_project_list'),
     path('project/<int:project_id>/overview/', ProjectOverviewView.as_view(), name='project_overview'),
     path('project/<int:project_id>/', ProjectOverviewView.as_view(), name='project_detail'),
     path('project/<int:project_id>/timeline/', ProjectTimelineView.as_view(), name='project_timeline'),
     path('update_phase_status/<int:phase_id>/', update_phase_status, name='update_phase_status'),
     path('update_milestone_status/<int:milestone_id>/', update_milestone_status, name='update_milestone_status'),
     path('update_timeline_order/', update_timeline_order, name='update_timeline_order'),
+    path('project/<int:project_id>/timeline/order/', update_timeline_order, name='project_timeline_order'),
     path('project/<int:project_id>/service_delivery/', ProjectServiceDeliveryView.as_view(), name='project_service_delivery'),
     path('project/<int:project_id>/health_products_and_technologies/', ProjectHealthProductsTechnologiesView.as_view(), name='project_health_products_technologies'),
     path('project/<int:project_id>/human_resource_for_health/', ProjectHumanResourceForHealthView.as_view(), name='project_human_resource_for_health'),
@@ -25,14 +28,18 @@ urlpatterns = [
     path('project/<int:project_id>/health_financing/', ProjectHealthFinancingView.as_view(), name='project_health_financing'),
     path('project/<int:project_id>/leadership_governance/', ProjectLeadershipGovernanceView.as_view(), name='project_leadership_governance'),
     path('project/<int:project_id>/data_quality/', ProjectDataQualityView.as_view(), name='project_data_quality'),
-    path('project/<int:project_id>/baseline/', ProjectBaselineView.as_view(), name='project_baseline'),
+    path('project/<int:project_id>/baseline/', lazy_view('research_dashboard.baseline_views.ProjectBaselineView'), name='project_baseline'),
 #     path('project/<int:project_id>/staff_profile/', StaffingDashboardView.as_view(), name='staffing_dashboard'),
     path('project/<int:project_id>/download/<int:document_id>/', 
          ProjectOverviewView.as_view(), name='download_document'),
     path('project/<int:project_id>/upload_document/', 
          ProjectOverviewView.as_view(), name='upload_document'),
-    path('api/county-boundaries/', county_boundaries_api, name='api_county_boundaries'),
-    path('invalidate-baseline-cache/', invalidate_baseline_cache, name='invalidate_baseline_cache'),
+    path('api/county-boundaries/', lazy_view('research_dashboard.geo_views.county_boundaries_api'), name='api_county_boundaries'),
+    path('api/project/<int:project_id>/baseline/<str:tab>/charts', lazy_view('research_dashboard.baseline_views.ProjectBaselineChartsView'), name='api_baseline_charts'),
+    path('api/project/<int:project_id>/baseline/chart/<str:chart>', lazy_view('research_dashboard.baseline_views.ProjectBaselineChartView'), name='api_baseline_chart'),
+    path('api/project/<int:project_id>/baseline/choropleth/<str:metric>', lazy_view('research_dashboard.baseline_views.ProjectBaselineChoroplethView'), name='api_baseline_choropleth'),
+    path('invalidate-baseline-cache/', lazy_view('research_dashboard.baseline_views.invalidate_baseline_cache'), name='invalidate_baseline_cache'),
+    path('health/ready/', readiness_check, name='readiness_check'),
     path('about/', AboutView.as_view(), name='about'),
     path('evaluators/', EvaluatorListView.as_view(), name='evaluators'),
     path('evaluators/<int:pk>/delete/', EvaluatorDeleteView.as_view(), name='delete_evaluator'),
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# The warm-up tasks, in the order they are reported
+WARM_UP_TASKS = ('baseline', 'geodata', 'charts')
+
+# Warm-up progress of this process, reported by the readiness endpoint.
+# status is one of 'cold', 'warming', 'ready' or 'failed'; tasks maps each
+# finished warm-up task to 'ok' or 'failed' (errors are only logged).
+_state = {'status': 'cold', 'started_at': None, 'finished_at': None, 'tasks': {}}
+_state_lock = threading.Lock()
+
+
+def _warm_baseline():
+    # Imported lazily: the warm-up is triggered from app and server startup,
+    # and the analytics modules are only loaded once it actually runs.
+    from .baseline_data import warm_up_baseline_cache
+
+    if not warm_up_baseline_cache():
+        raise RuntimeError("baseline data could not be loaded")
+
+
+def _warm_geodata():
+    from .boundaries import get_boundary_index
+    from .geo_views import get_county_geojson
+
+    get_boundary_index()
+    if get_county_geojson() is None:
+        raise RuntimeError("county boundaries could not be loaded")
+
+
+def _warm_charts():
+    from .baseline_data import get_baseline_cube, get_served_baseline_version
+    from .baseline_views import warm_baseline_charts
+
+    cube = get_baseline_cube()
+    warm_baseline_charts(get_served_baseline_version(), cube)
+
+
+def run_warm_up():
+    """
+    Warms this process: the baseline frames and county geodata load in
+    parallel, then the unfiltered charts are rendered (or pulled from the
+    shared cache) once the baseline data is in. Returns True if every task
+    succeeded.
+    """
+    with _state_lock:
+        _state.update(status='warming', started_at=time.time(), finished_at=None, tasks={})
+
+    def run(name, task):
+        try:
+            task()
+            result = 'ok'
+        except Exception:
+            logger.exception(f"Warm-up task '{name}' failed")
+            result = 'failed'
+        with _state_lock:
+            _state['tasks'][name] = result
+        return result == 'ok'
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        geodata = executor.submit(run, 'geodata', _warm_geodata)
+        baseline_ok = run('baseline', _warm_baseline)
+        charts_ok = baseline_ok and run('charts', _warm_charts)
+        ok = baseline_ok and charts_ok and geodata.result()
+
+    with _state_lock:
+        _state.update(status='ready' if ok else 'failed', finished_at=time.time())
+    logger.info(f"Warm-up finished ({_state['status']}) in {_state['finished_at'] - _state['started_at']:.1f}s")
+    return ok
+
+
+def start_warm_up():
+    """Runs the warm-up in a background thread, unless it already ran or is running."""
+    with _state_lock:
+        if _state['status'] in ('warming', 'ready'):
+            return
+        _state['status'] = 'warming'
+    threading.Thread(target=run_warm_up, name='warm-up', daemon=True).start()
+
+
+def get_warm_up_state():
+    """A copy of this process's warm-up progress."""
+    with _state_lock:
+        return dict(_state, tasks=dict(_state['tasks']))
+
+
+def is_ready():
+    return _state['status'] == 'ready'